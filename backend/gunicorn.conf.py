@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration for production
+Every setting can be overridden through GUNICORN_* environment variables
+"""
+
+import os
+
+# Port 5001 matches run.py and the nginx proxy in the root Dockerfile
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('FLASK_PORT', '5001')}")
+
+# One process per core; each runs a pool of threads because requests mostly
+# wait on Groq and TiDB rather than burning CPU
+workers = int(os.getenv('GUNICORN_WORKERS', str(os.cpu_count() or 1)))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# With GUNICORN_WORKER_CLASS=gevent, sockets are monkey-patched so the
+# Groq (requests) and TiDB (PyMySQL) calls yield while they wait, and each
+# worker serves up to this many requests concurrently instead of `threads`.
+# bcrypt and PDF extraction are moved to native threads (utils/cooperative.py).
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+
+# Roadmap generation and streamed analyses can hold a request open for a
+# minute or more; timeout only has to catch workers that stopped responding
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '180'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '60'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically to bound memory growth; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Connection pools and thread/process pools are created per pid on first
+    # use, so a worker never shares sockets or threads with the master
+    concurrency = f"{worker_connections} connections" if worker_class == 'gevent' else f"{threads} threads"
+    server.log.info(f"Worker {worker.pid} started ({worker_class}, {concurrency})")
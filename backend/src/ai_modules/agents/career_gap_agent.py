@@ -1,80 +1,32 @@
 import json
 import os
-import requests
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 from datetime import datetime
 import logging
-from pathlib import Path
+
+from utils.llm_client import llm_client, LLMError, LLMTimeoutError
+from utils.model_health import model_health
+from utils.json_stream import JsonArrayStreamer
+from ai_modules.prompt_registry import prompt_registry, PromptTemplateError
 
 logger = logging.getLogger(__name__)
 
-class CareerGapAgent:
-    """
-    AI-powered intelligent career gap analysis that leverages LLM capabilities
-    """
-    
-    def __init__(self, user_id: int, llm_model: str = "llama-3.1-70b-versatile"):
-        self.user_id = user_id
-        self.llm_model = llm_model
-        self.api_key = os.getenv("GROQ_API_KEY")
-        
-    def run_gap_analysis(self, resume_data: dict, job_data: dict) -> dict:
-        """
-        AI-powered intelligent analysis that leverages LLM capabilities fully
-        """
-        try:
-            logger.info(f"Starting AI-powered gap analysis for user {self.user_id}")
-            
-            # Use enhanced prompt that lets AI do the intelligent work
-            analysis = self._generate_ai_powered_analysis(resume_data, job_data)
-            
-            logger.info(f"Completed AI-powered gap analysis for user {self.user_id}")
-            
-            return {
-                "user_id": self.user_id,
-                "analysis": analysis,
-                "status": "success"
-            }
-            
-        except Exception as e:
-            logger.error(f"AI analysis error: {e}")
-            return {
-                "user_id": self.user_id,
-                "analysis": self._create_smart_fallback(resume_data, job_data),
-                "status": "success"  # Always success to avoid redirect
-            }
-    
-    def _generate_ai_powered_analysis(self, resume_data: dict, job_data: dict) -> dict:
-        """
-        Generate analysis using enhanced AI prompt that leverages LLM intelligence
-        """
-        # Load the better prompt from the text file and enhance it
-        prompt = self._create_enhanced_intelligent_prompt(resume_data, job_data)
-        
-        try:
-            response = self._call_llm(prompt, max_tokens=2500)
-            parsed_analysis = self._parse_json_response(response)
-            
-            # Validate and enhance the analysis
-            return self._validate_and_enhance_analysis(parsed_analysis, resume_data, job_data)
-            
-        except Exception as e:
-            logger.error(f"AI analysis generation failed: {e}")
-            return self._create_smart_fallback(resume_data, job_data)
-    
-    def _create_enhanced_intelligent_prompt(self, resume_data: dict, job_data: dict) -> str:
-        """
-        Create an enhanced prompt that leverages AI intelligence instead of hardcoded rules
-        """
-        # Load base prompt from file if available
-        prompt_path = Path("src/ai_modules/prompts/gap_analysis_prompt.txt")
-        if prompt_path.exists():
-            base_prompt = prompt_path.read_text()
-        else:
-            base_prompt = self._get_fallback_prompt_template()
-        
-        # Enhance the base prompt with intelligent instructions
-        enhanced_prompt = f"""ENHANCED CAREER GAP ANALYSIS - USE YOUR AI INTELLIGENCE
+# Seconds before a fallback model is raced against a slow one; GROQ_HEDGING=false
+# restores strictly sequential fallback
+HEDGING_ENABLED = os.getenv("GROQ_HEDGING", "True").lower() == "true"
+HEDGE_DELAY = float(os.getenv("GROQ_HEDGE_DELAY", "8"))
+
+# Models in order of preference
+GAP_ANALYSIS_MODELS = [
+    "llama-3.1-70b-versatile",
+    "llama3-70b-8192",
+    "llama-3.1-8b-instant"
+]
+
+SYSTEM_PROMPT = "You are a senior technical recruiter and career analyst. Provide realistic, evidence-based skill assessments. Never use 0% for candidates with programming experience."
+
+# Wrapped around the base prompt from ai_modules/prompts/gap_analysis_prompt.txt
+ENHANCED_PROMPT_WRAPPER = """ENHANCED CAREER GAP ANALYSIS - USE YOUR AI INTELLIGENCE
 
 You are a senior technical recruiter and career analyst with deep expertise in technology hiring. Your job is to provide realistic, intelligent career gap analysis.
 
@@ -120,15 +72,8 @@ ADDITIONAL CONTEXT FOR BETTER ANALYSIS:
 
 Remember: Use your full AI capabilities to provide intelligent, realistic assessment. Don't limit yourself to simple keyword matching."""
 
-        # Replace placeholders with actual data
-        enhanced_prompt = enhanced_prompt.replace("{resume}", json.dumps(resume_data, indent=2))
-        enhanced_prompt = enhanced_prompt.replace("{job}", json.dumps(job_data, indent=2))
-        
-        return enhanced_prompt
-    
-    def _get_fallback_prompt_template(self) -> str:
-        """Fallback prompt template if file not found"""
-        return """IMPORTANT: You must respond ONLY with valid JSON. Do not include any text before or after the JSON.
+# Used when gap_analysis_prompt.txt is missing or has the wrong placeholders
+FALLBACK_GAP_ANALYSIS_PROMPT = """IMPORTANT: You must respond ONLY with valid JSON. Do not include any text before or after the JSON.
 
 Analyze the resume and job description data provided below and return ONLY a JSON object with the following structure:
 
@@ -166,6 +111,118 @@ Job Description:
 {job}
 
 Remember: Provide realistic skill percentages based on actual evidence. Someone with programming projects should NOT have 0% current levels."""
+
+
+def _compile_gap_analysis_prompt():
+    """Compose the wrapper and base prompt once, leaving only {resume} and {job} to fill per request"""
+    try:
+        base_prompt = prompt_registry.get("gap_analysis_prompt", placeholders={"resume", "job"}).text
+    except PromptTemplateError as e:
+        logger.error(f"{e}; using the built-in gap analysis prompt")
+        base_prompt = FALLBACK_GAP_ANALYSIS_PROMPT
+    wrapper = prompt_registry.register("gap_analysis_wrapper", ENHANCED_PROMPT_WRAPPER, placeholders={"base_prompt"})
+    return prompt_registry.register(
+        "gap_analysis_enhanced",
+        wrapper.render(base_prompt=base_prompt),
+        placeholders={"resume", "job"}
+    )
+
+
+GAP_ANALYSIS_PROMPT = _compile_gap_analysis_prompt()
+
+class CareerGapAgent:
+    """
+    AI-powered intelligent career gap analysis that leverages LLM capabilities
+    """
+    
+    def __init__(self, user_id: int, llm_model: str = "llama-3.1-70b-versatile"):
+        self.user_id = user_id
+        self.llm_model = llm_model
+        self.api_key = os.getenv("GROQ_API_KEY")
+        
+    def run_gap_analysis(self, resume_data: dict, job_data: dict) -> dict:
+        """
+        AI-powered intelligent analysis that leverages LLM capabilities fully
+        """
+        try:
+            logger.info(f"Starting AI-powered gap analysis for user {self.user_id}")
+            
+            # Use enhanced prompt that lets AI do the intelligent work
+            analysis = self._generate_ai_powered_analysis(resume_data, job_data)
+            
+            logger.info(f"Completed AI-powered gap analysis for user {self.user_id}")
+            
+            return {
+                "user_id": self.user_id,
+                "analysis": analysis,
+                "status": "success"
+            }
+            
+        except Exception as e:
+            logger.error(f"AI analysis error: {e}")
+            return {
+                "user_id": self.user_id,
+                "analysis": self._create_smart_fallback(resume_data, job_data),
+                "status": "success"  # Always success to avoid redirect
+            }
+    
+    def stream_gap_analysis(self, resume_data: dict, job_data: dict) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of run_gap_analysis.
+        Yields ("delta", text) per token chunk, ("item", skill) for every completed
+        skillsToImprove entry, then ("done", result) shaped like run_gap_analysis
+        """
+        prompt = self._create_enhanced_intelligent_prompt(resume_data, job_data)
+        skills = JsonArrayStreamer("skillsToImprove")
+        chunks = []
+        
+        try:
+            for text in self._stream_llm(prompt, max_tokens=2500):
+                chunks.append(text)
+                yield "delta", text
+                for skill in skills.feed(text):
+                    if isinstance(skill, dict):
+                        self._normalize_skill(skill, resume_data)
+                    yield "item", skill
+            
+            parsed_analysis = self._parse_json_response("".join(chunks))
+            analysis = self._validate_and_enhance_analysis(parsed_analysis, resume_data, job_data)
+        except Exception as e:
+            logger.error(f"AI analysis stream failed: {e}")
+            analysis = self._create_smart_fallback(resume_data, job_data)
+        
+        yield "done", {
+            "user_id": self.user_id,
+            "analysis": analysis,
+            "status": "success"
+        }
+    
+    def _generate_ai_powered_analysis(self, resume_data: dict, job_data: dict) -> dict:
+        """
+        Generate analysis using enhanced AI prompt that leverages LLM intelligence
+        """
+        # Load the better prompt from the text file and enhance it
+        prompt = self._create_enhanced_intelligent_prompt(resume_data, job_data)
+        
+        try:
+            response = self._call_llm(prompt, max_tokens=2500)
+            parsed_analysis = self._parse_json_response(response)
+            
+            # Validate and enhance the analysis
+            return self._validate_and_enhance_analysis(parsed_analysis, resume_data, job_data)
+            
+        except Exception as e:
+            logger.error(f"AI analysis generation failed: {e}")
+            return self._create_smart_fallback(resume_data, job_data)
+    
+    def _create_enhanced_intelligent_prompt(self, resume_data: dict, job_data: dict) -> str:
+        """
+        Create an enhanced prompt that leverages AI intelligence instead of hardcoded rules
+        """
+        return GAP_ANALYSIS_PROMPT.render(
+            resume=json.dumps(resume_data, indent=2),
+            job=json.dumps(job_data, indent=2)
+        )
     
     def _validate_and_enhance_analysis(self, analysis: dict, resume_data: dict, job_data: dict) -> dict:
         """
@@ -181,29 +238,33 @@ Remember: Provide realistic skill percentages based on actual evidence. Someone
         # Validate and fix skill scores if they're unrealistic
         if "skillsToImprove" in analysis:
             for skill in analysis["skillsToImprove"]:
-                if isinstance(skill.get("current"), (int, float)):
-                    # Ensure no 0% scores for candidates with any programming experience
-                    if skill["current"] == 0 and self._has_programming_experience(resume_data):
-                        skill["current"] = 25  # Minimum for someone with any coding background
-                    
-                    # Ensure scores are within reasonable bounds
-                    skill["current"] = max(5, min(95, skill["current"]))
-                    
-                    # Ensure target is reasonable
-                    if "target" not in skill or skill["target"] < skill["current"]:
-                        skill["target"] = 80
-                    
-                    # Set urgency based on gap
-                    gap = skill["target"] - skill["current"]
-                    if gap > 40:
-                        skill["urgency"] = "High"
-                    elif gap > 20:
-                        skill["urgency"] = "Medium"
-                    else:
-                        skill["urgency"] = "Low"
+                self._normalize_skill(skill, resume_data)
         
         return analysis
     
+    def _normalize_skill(self, skill: dict, resume_data: dict) -> None:
+        """Fix unrealistic scores and derive urgency for one skillsToImprove entry"""
+        if isinstance(skill.get("current"), (int, float)):
+            # Ensure no 0% scores for candidates with any programming experience
+            if skill["current"] == 0 and self._has_programming_experience(resume_data):
+                skill["current"] = 25  # Minimum for someone with any coding background
+            
+            # Ensure scores are within reasonable bounds
+            skill["current"] = max(5, min(95, skill["current"]))
+            
+            # Ensure target is reasonable
+            if "target" not in skill or skill["target"] < skill["current"]:
+                skill["target"] = 80
+            
+            # Set urgency based on gap
+            gap = skill["target"] - skill["current"]
+            if gap > 40:
+                skill["urgency"] = "High"
+            elif gap > 20:
+                skill["urgency"] = "Medium"
+            else:
+                skill["urgency"] = "Low"
+    
     def _has_programming_experience(self, resume_data: dict) -> bool:
         """Check if candidate has any programming experience"""
         if not isinstance(resume_data, dict):
@@ -286,62 +347,71 @@ Remember: Provide realistic skill percentages based on actual evidence. Someone
         """Enhanced LLM call with better error handling"""
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not set")
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
         
-        # Try multiple models for better reliability
-        models_to_try = [
-            "llama-3.1-70b-versatile",
-            "llama3-70b-8192", 
-            "llama-3.1-8b-instant"
-        ]
+        # Try multiple models for better reliability, skipping any whose circuit is open
+        models_to_try = model_health.available_models(GAP_ANALYSIS_MODELS) or GAP_ANALYSIS_MODELS
+        
+        try:
+            model_name, content = llm_client.hedged_chat_content(
+                models_to_try,
+                self._build_messages(prompt),
+                hedge_delay=HEDGE_DELAY if HEDGING_ENABLED else None,
+                validate=self._parse_json_response,
+                temperature=0.2,
+                max_tokens=max_tokens,
+                timeout=45,
+                api_key=self.api_key
+            )
+            logger.info(f"Gap analysis answered by {model_name}")
+            return content
+        except LLMTimeoutError:
+            raise Exception("All models timed out")
+        except LLMError as e:
+            raise Exception(f"All models failed. Last error: {e.status_code or e}")
+
+    
+    def _stream_llm(self, prompt: str, max_tokens: int = 2000) -> Iterator[str]:
+        """Stream the completion from the first model that starts answering"""
+        if not self.api_key:
+            raise ValueError("GROQ_API_KEY not set")
+        
+        models_to_try = model_health.available_models(GAP_ANALYSIS_MODELS) or GAP_ANALYSIS_MODELS
+        last_error = None
         
         for model_name in models_to_try:
-            payload = {
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a senior technical recruiter and career analyst. Provide realistic, evidence-based skill assessments. Never use 0% for candidates with programming experience."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "model": model_name,
-                "temperature": 0.2,
-                "max_tokens": max_tokens,
-                "stream": False
-            }
-            
+            started = False
             try:
-                response = requests.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=45
-                )
-                
-                if response.status_code == 200:
-                    return response.json()["choices"][0]["message"]["content"]
-                else:
-                    logger.warning(f"Model {model_name} failed with status {response.status_code}")
-                    if model_name == models_to_try[-1]:
-                        raise Exception(f"All models failed. Last error: {response.status_code}")
-                        
-            except requests.exceptions.Timeout:
-                logger.warning(f"Model {model_name} timed out")
-                if model_name == models_to_try[-1]:
-                    raise Exception("All models timed out")
-            except Exception as e:
-                logger.warning(f"Model {model_name} failed: {e}")
-                if model_name == models_to_try[-1]:
+                for text in llm_client.stream_chat_content(
+                    model_name,
+                    self._build_messages(prompt),
+                    temperature=0.2,
+                    max_tokens=max_tokens,
+                    timeout=45,
+                    api_key=self.api_key
+                ):
+                    started = True
+                    yield text
+                return
+            except LLMError as e:
+                # Tokens already went to the client, so a mid-stream failure can't fall back
+                if started:
                     raise
+                last_error = e
+                logger.warning(f"Streaming with {model_name} failed: {e}")
         
-        raise Exception("No models available")
+        raise Exception(f"All models failed. Last error: {last_error}")
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
     
     def _parse_json_response(self, response: str) -> dict:
         """Parse JSON response with robust cleaning"""
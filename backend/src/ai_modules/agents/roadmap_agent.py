@@ -2,18 +2,58 @@ import os
 # from pathlib import Path
 from dotenv import load_dotenv
 from datetime import date
-from typing import List
+from typing import Any, Iterator, List, Tuple
 import json
-import openai
 
-# Configure Groq API for roadmap generation
+# Roadmap generation uses its own Groq key when one is configured
 load_dotenv()
-openai.api_key = os.getenv("GROQ_API_KEY_NAYAN")
-openai.api_base = "https://api.groq.com/openai/v1"
+ROADMAP_API_KEY = os.getenv("GROQ_API_KEY_NAYAN") or os.getenv("GROQ_API_KEY")
 
 from pydantic import BaseModel, Field
 
 from models.ai_suggestion_model import AISuggestionModel
+from config.database import db_config
+from utils.llm_client import llm_client
+from utils.json_stream import JsonArrayStreamer
+from ai_modules.prompt_registry import prompt_registry
+
+ROADMAP_MODEL = "llama-3.1-8b-instant"
+
+ROADMAP_SYSTEM_PROMPT = prompt_registry.register("roadmap_system", """
+You are an expert career coach and technical planner. Your task is to create a
+structured, realistic study plan based on an analysis of a person's resume.
+The plan should break down the learning topics chronologically over the
+specified duration. Today's date is {today}.
+
+Return your response as a valid JSON object with this exact structure:
+{
+  "plan": [
+    {
+      "date": "YYYY-MM-DD",
+      "topic": "The specific skills or concepts to be studied on this date",
+      "skill": "The overarching skill this topic belongs to (e.g., Python, Docker, React.js)",
+      "priority": "High/Medium/Low"
+    }
+  ]
+}
+
+Important:
+- Return ONLY valid JSON, no extra text or formatting
+- Make sure dates are consecutive and realistic
+- Include all required fields for each topic
+- Priority should be exactly "High", "Medium", or "Low"
+""", placeholders={"today"})
+
+ROADMAP_USER_PROMPT = prompt_registry.register("roadmap_user", """
+Please create a study plan for me based on the following resume analysis.
+I want to complete this plan in {duration}. Make sure that the plan follows consecutive days.
+
+Resume Analysis:
+"{suggestions}"
+
+Along with the task, give me the skill for which the task is relevant, and a priority level (High, Medium, Low).
+""", placeholders={"duration", "suggestions"})
+
 # 1. Define the desired JSON output structure using Pydantic
 class StudyTopic(BaseModel):
     """A single topic in the study plan."""
@@ -27,16 +67,10 @@ class StudyPlan(BaseModel):
     plan: List[StudyTopic] = Field(description="The list of study topics.")
 
 
-def create_study_plan(duration, user_id) -> dict:
+def _build_study_plan_prompts(duration, user_id) -> Tuple[str, str]:
     """
-    Generates a structured study plan based on resume analysis and a duration.
-
-    Args:
-        resume_analysis: Text analysis of a resume, highlighting strengths and weaknesses.
-        duration: The total duration for the study plan (e.g., "3 months", "6 weeks").
-
-    Returns:
-        A dictionary containing the structured study plan in JSON format.
+    Builds the system and user prompts for a study plan from the user's stored suggestions.
+    Releases the request's database connection once the suggestions are loaded.
     """
     # 2. Initialize the Google Gemini model
     # The .with_structured_output method instructs the LLM to return data
@@ -86,20 +120,15 @@ def create_study_plan(duration, user_id) -> dict:
 # """
 
     print("🔍 User_id:", user_id)
-    user_suggestions = AISuggestionModel.get_suggestions_by_user(user_id)
+    # Only the 20 highest-priority suggestions fit the prompt; let the database pick them
+    user_suggestions = AISuggestionModel.get_suggestions_by_user(user_id, limit=20)
+
+    # Free the request's database connection before the long LLM call below
+    db_config.release_request_connection()
 
     print("📋 Raw user_suggestions:", user_suggestions)
     print(f"📊 Number of suggestions: {len(user_suggestions) if user_suggestions else 0}")
 
-    # Limit suggestions to avoid token limit issues - prioritize high priority ones
-    if user_suggestions and len(user_suggestions) > 20:
-        print("⚠️ Too many suggestions, filtering to top 20...")
-        # Sort by priority (high first) and take top 20
-        priority_order = {'high': 0, 'medium': 1, 'low': 2}
-        sorted_suggestions = sorted(user_suggestions, key=lambda x: priority_order.get(x.get('priority', 'low'), 2))
-        user_suggestions = sorted_suggestions[:20]
-        print(f"📊 Filtered to {len(user_suggestions)} suggestions")
-
     suggestions_text = "\n".join([f"- {s['title']}: {s['content']}" for s in user_suggestions]) if user_suggestions else "No specific suggestions provided."
     print("🔤 Formatted suggestions_text:")
     print(f"📏 Suggestions text length: {len(suggestions_text)}")
@@ -108,79 +137,56 @@ def create_study_plan(duration, user_id) -> dict:
     else:
         print(suggestions_text)
     # Specify the desired duration
-    study_duration = duration
+    study_duration = str(duration)
     
-    # Create the prompt for Groq API
-    system_prompt = f"""
-You are an expert career coach and technical planner. Your task is to create a
-structured, realistic study plan based on an analysis of a person's resume.
-The plan should break down the learning topics chronologically over the
-specified duration. Today's date is {date.today().isoformat()}.
+    # Create the prompts for Groq API
+    system_prompt = ROADMAP_SYSTEM_PROMPT.render(today=date.today().isoformat())
+    user_prompt = ROADMAP_USER_PROMPT.render(duration=study_duration, suggestions=suggestions_text)
 
-Return your response as a valid JSON object with this exact structure:
-{{
-  "plan": [
-    {{
-      "date": "YYYY-MM-DD",
-      "topic": "The specific skills or concepts to be studied on this date",
-      "skill": "The overarching skill this topic belongs to (e.g., Python, Docker, React.js)",
-      "priority": "High/Medium/Low"
-    }}
-  ]
-}}
+    print(f"📝 System prompt length: {len(system_prompt)}")
+    print(f"📝 User prompt length: {len(user_prompt)}")
+    total_length = len(system_prompt) + len(user_prompt)
+    print(f"📝 Total prompt length: {total_length}")
+    
+    # Safety check - if still too long, truncate suggestions further
+    if total_length > 15000:  # Conservative limit
+        print("⚠️ Prompt still too long, using fallback minimal suggestions...")
+        minimal_suggestions = "Focus on improving cloud infrastructure, advanced database skills, and modern development practices."
+        user_prompt = ROADMAP_USER_PROMPT.render(duration=study_duration, suggestions=minimal_suggestions)
+        print(f"📝 Revised user prompt length: {len(user_prompt)}")
 
-Important:
-- Return ONLY valid JSON, no extra text or formatting
-- Make sure dates are consecutive and realistic
-- Include all required fields for each topic
-- Priority should be exactly "High", "Medium", or "Low"
-"""
+    return system_prompt, user_prompt
 
-    user_prompt = f"""
-Please create a study plan for me based on the following resume analysis.
-I want to complete this plan in {study_duration}. Make sure that the plan follows consecutive days.
 
-Resume Analysis:
-"{suggestions_text}"
+def create_study_plan(duration, user_id) -> dict:
+    """
+    Generates a structured study plan based on resume analysis and a duration.
 
-Along with the task, give me the skill for which the task is relevant, and a priority level (High, Medium, Low).
-"""
+    Args:
+        resume_analysis: Text analysis of a resume, highlighting strengths and weaknesses.
+        duration: The total duration for the study plan (e.g., "3 months", "6 weeks").
+
+    Returns:
+        A dictionary containing the structured study plan in JSON format.
+    """
+    system_prompt, user_prompt = _build_study_plan_prompts(duration, user_id)
 
     try:
         print("🚀 Making Groq API call...")
-        print(f"📝 System prompt length: {len(system_prompt)}")
-        print(f"📝 User prompt length: {len(user_prompt)}")
-        total_length = len(system_prompt) + len(user_prompt)
-        print(f"📝 Total prompt length: {total_length}")
-        
-        # Safety check - if still too long, truncate suggestions further
-        if total_length > 15000:  # Conservative limit
-            print("⚠️ Prompt still too long, using fallback minimal suggestions...")
-            minimal_suggestions = "Focus on improving cloud infrastructure, advanced database skills, and modern development practices."
-            user_prompt = f"""
-Please create a study plan for me based on the following resume analysis.
-I want to complete this plan in {study_duration}. Make sure that the plan follows consecutive days.
-
-Resume Analysis:
-"{minimal_suggestions}"
-
-Along with the task, give me the skill for which the task is relevant, and a priority level (High, Medium, Low).
-"""
-            print(f"📝 Revised user prompt length: {len(user_prompt)}")
         
         # Make direct API call to Groq
-        response = openai.ChatCompletion.create(
-            model="llama-3.1-8b-instant",
+        result = llm_client.chat_content(
+            model=ROADMAP_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.5,
-            max_tokens=3000
-        )
+            max_tokens=3000,
+            api_key=ROADMAP_API_KEY
+        ).strip()
         
         print("✅ Groq API call successful")
-        result = response['choices'][0]['message']['content'].strip()
         print(f"📄 Raw Groq response length: {len(result)}")
         print(f"📄 Raw Groq response (first 200 chars): {result[:200]}...")
         
@@ -204,6 +210,47 @@ Along with the task, give me the skill for which the task is relevant, and a pri
             "error": f"API call failed: {str(e)}"
         }
 
+
+def stream_study_plan(duration, user_id) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of create_study_plan.
+    Yields ("delta", text) per token chunk, ("item", topic) for every completed
+    plan entry, then ("done", roadmap) shaped like create_study_plan's result.
+    """
+    system_prompt, user_prompt = _build_study_plan_prompts(duration, user_id)
+    plan_items = JsonArrayStreamer("plan")
+    chunks = []
+
+    try:
+        for text in llm_client.stream_chat_content(
+            model=ROADMAP_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.5,
+            max_tokens=3000,
+            api_key=ROADMAP_API_KEY
+        ):
+            chunks.append(text)
+            yield "delta", text
+            for topic in plan_items.feed(text):
+                yield "item", topic
+    except Exception as e:
+        yield "done", {
+            "plan": [],
+            "error": f"API call failed: {str(e)}"
+        }
+        return
+
+    try:
+        yield "done", json.loads("".join(chunks).strip())
+    except json.JSONDecodeError:
+        yield "done", {
+            "plan": [],
+            "error": "Failed to generate study plan - invalid JSON response from AI"
+        }
+
 if __name__ == "__main__":
     create_study_plan()
 
@@ -1,16 +1,12 @@
-from pathlib import Path
 import os
 import json
-import requests
 
-def get_prompt_template():
-    """Load the gap analysis prompt template"""
-    prompt_path = Path("src/langchain/prompts/gap_analysis_prompt.txt")
-    if prompt_path.exists():
-        return prompt_path.read_text()
-    else:
-        # Fallback prompt if file not found
-        return """IMPORTANT: Respond ONLY with valid JSON. No additional text.
+from utils.llm_client import llm_client, LLMError
+from utils.model_health import model_health
+from ai_modules.prompt_registry import prompt_registry, PromptTemplate, PromptTemplateError
+
+# Fallback prompt if gap_analysis_prompt.txt is missing or has the wrong placeholders
+FALLBACK_PROMPT_TEMPLATE = """IMPORTANT: Respond ONLY with valid JSON. No additional text.
 
 Analyze the resume and job data and return this JSON structure:
 
@@ -39,6 +35,24 @@ Job Description:
 
 Remember: Respond ONLY with the JSON object above, filled with your analysis."""
 
+
+def _load_prompt_template() -> PromptTemplate:
+    """Resolve the gap analysis prompt once, registering the fallback if the file is unusable"""
+    try:
+        return prompt_registry.get("gap_analysis_prompt", placeholders={"resume", "job"})
+    except PromptTemplateError as e:
+        print(f"{e}; using the fallback prompt")
+        return prompt_registry.register("gap_analysis_chain_fallback", FALLBACK_PROMPT_TEMPLATE,
+                                        placeholders={"resume", "job"})
+
+
+GAP_ANALYSIS_PROMPT = _load_prompt_template()
+
+
+def get_prompt_template() -> PromptTemplate:
+    """Return the gap analysis prompt template"""
+    return GAP_ANALYSIS_PROMPT
+
 def run_gap_analysis(resume_data: dict, job_data: dict, llm=None):
     """Run gap analysis using direct Groq API call"""
     print(f"Starting gap analysis...")
@@ -68,64 +82,51 @@ def run_gap_analysis(resume_data: dict, job_data: dict, llm=None):
             print(f"Error converting job data: {e}")
             job_text = str(job_data)
         
-        # Get the prompt template and format it
-        prompt_template = get_prompt_template()
-        # Use replace instead of format to avoid conflicts with JSON braces in the template
-        formatted_prompt = prompt_template.replace("{resume}", resume_text).replace("{job}", job_text)
+        # Get the precompiled prompt template and fill it in
+        formatted_prompt = get_prompt_template().render(resume=resume_text, job=job_text)
         
         print(f"Sending prompt to Groq API...")
         print(f"Formatted prompt length: {len(formatted_prompt)}")
         
-        # Make direct API call to Groq
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Try different models in order of preference
-        models_to_try = [
+        # Try different models in order of preference, skipping any whose circuit is open
+        models = [
             "llama-3.1-70b-versatile",
             "llama3-70b-8192",
             "llama-3.1-8b-instant",
             "mixtral-8x7b-32768"
         ]
+        models_to_try = model_health.available_models(models) or models
         
-        for model_name in models_to_try:
-            payload = {
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a JSON API. You must ONLY return valid JSON objects. Never return any text outside of JSON format. Your response must be parseable by json.loads() in Python."
-                    },
-                    {
-                        "role": "user",
-                        "content": formatted_prompt
-                    }
-                ],
-                "model": model_name,
-                "temperature": 0.1,
-                "max_tokens": 2000,
-                "stream": False
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a JSON API. You must ONLY return valid JSON objects. Never return any text outside of JSON format. Your response must be parseable by json.loads() in Python."
+            },
+            {
+                "role": "user",
+                "content": formatted_prompt
             }
-            
+        ]
+        
+        for model_name in models_to_try:
             print(f"Trying model: {model_name}")
             
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
+            try:
+                response_data = llm_client.chat_completion(
+                    model=model_name,
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=2000,
+                    timeout=60,
+                    api_key=api_key
+                )
                 print(f"Success with model: {model_name}")
                 break
-            else:
-                print(f"Model {model_name} failed with status {response.status_code}: {response.text}")
+            except LLMError as e:
+                print(f"Model {model_name} failed with status {e.status_code}: {e.body}")
                 if model_name == models_to_try[-1]:  # Last model
-                    raise Exception(f"All models failed. Last error: {response.status_code} - {response.text}")
+                    raise Exception(f"All models failed. Last error: {e.status_code} - {e.body}")
         
-        response_data = response.json()
         llm_output = response_data["choices"][0]["message"]["content"]
         
         print(f"LLM Raw Response:")
@@ -0,0 +1,132 @@
+"""
+Prompt template registry
+Loads every template in ai_modules/prompts once at import, precompiles it and times its renders
+"""
+
+import hashlib
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.metrics import LatencyStats, register_metrics
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+# Only bare identifiers in braces are placeholders, so the JSON examples in
+# the templates pass through untouched (no str.format escaping needed)
+PLACEHOLDER = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class PromptTemplateError(Exception):
+    """Raised when a template is missing or its placeholders don't match what a caller expects"""
+
+
+class PromptTemplate:
+    """
+    A template split once into literal segments and placeholder slots.
+
+    Rendering is a single join over the precompiled segments, so values
+    are never rescanned for placeholders. ``version`` is a short hash of
+    the template text, for cache keys and logs.
+    """
+
+    def __init__(self, name: str, text: str, source: str):
+        self.name = name
+        self.text = text
+        self.source = source
+        self.version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+        self._segments = self._compile(text)
+        self.placeholders = frozenset(slot for kind, slot in self._segments if kind == 'slot')
+        self.render_time = LatencyStats()
+
+    @staticmethod
+    def _compile(text: str) -> List[Tuple[str, str]]:
+        segments = []
+        position = 0
+        for match in PLACEHOLDER.finditer(text):
+            if match.start() > position:
+                segments.append(('text', text[position:match.start()]))
+            segments.append(('slot', match.group(1)))
+            position = match.end()
+        if position < len(text):
+            segments.append(('text', text[position:]))
+        return segments
+
+    def render(self, **values: str) -> str:
+        """Fill every placeholder; raises PromptTemplateError if one has no value"""
+        started = time.perf_counter()
+        missing = self.placeholders - values.keys()
+        if missing:
+            raise PromptTemplateError(f"Prompt {self.name} is missing values for: {', '.join(sorted(missing))}")
+        rendered = ''.join(values[value] if kind == 'slot' else value for kind, value in self._segments)
+        self.render_time.observe((time.perf_counter() - started) * 1000)
+        return rendered
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'placeholders': sorted(self.placeholders),
+            'chars': len(self.text),
+            'render_time': self.render_time.snapshot()
+        }
+
+
+class PromptRegistry:
+    """Named prompt templates, loaded from disk or registered in code"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._templates = {}
+        self.load()
+
+    def load(self) -> None:
+        """(Re)load every ``*.txt`` file in the prompts directory, named by its stem"""
+        if not self.directory.is_dir():
+            logger.warning(f"Prompt directory {self.directory} not found")
+            return
+        for path in sorted(self.directory.glob("*.txt")):
+            text = path.read_text(encoding='utf-8')
+            if not text.strip():
+                logger.warning(f"Skipping empty prompt template {path.name}")
+                continue
+            template = PromptTemplate(path.stem, text, path.name)
+            self._templates[template.name] = template
+            logger.info(f"Loaded prompt {template.name} v{template.version} ({len(text)} chars)")
+
+    def register(self, name: str, text: str, placeholders: Optional[Iterable[str]] = None) -> PromptTemplate:
+        """Compile a template defined in code, validating its placeholders if given"""
+        template = PromptTemplate(name, text, 'inline')
+        self._check(template, placeholders)
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str, placeholders: Optional[Iterable[str]] = None) -> PromptTemplate:
+        """Look up a template, checking it uses exactly ``placeholders`` if given"""
+        template = self._templates.get(name)
+        if template is None:
+            raise PromptTemplateError(f"Prompt template {name} not found in {self.directory}")
+        self._check(template, placeholders)
+        return template
+
+    @staticmethod
+    def _check(template: PromptTemplate, placeholders: Optional[Iterable[str]]) -> None:
+        if placeholders is None:
+            return
+        expected = frozenset(placeholders)
+        if template.placeholders != expected:
+            raise PromptTemplateError(
+                f"Prompt {template.name} has placeholders {sorted(template.placeholders)}, "
+                f"expected {sorted(expected)}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: template.snapshot() for name, template in sorted(self._templates.items())}
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR)
+register_metrics('prompts', prompt_registry.stats)
@@ -10,6 +10,11 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 
+# Reject oversized request bodies before they are read; leaves room for
+# multipart overhead on top of the largest accepted PDF
+from utils.pdf_extractor import PDF_MAX_BYTES
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', str(PDF_MAX_BYTES + 1024 * 1024)))
+
 # Configure CORS
 # Configure CORS to be flexible for deployment
 # It will use the FRONTEND_URL from your environment, or default to localhost for development.
@@ -23,9 +28,17 @@ logger = logging.getLogger(__name__)
 
 # Import routes
 from routes.api_routes import api_bp
+from routes.admin_routes import admin_bp
+from config.database import db_config
 
 # Register blueprints
 app.register_blueprint(api_bp, url_prefix='/api')
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+@app.teardown_request
+def release_database_connection(error=None):
+    """Return the request-scoped database connection to the pool"""
+    db_config.release_request_connection(error)
 
 @app.route('/', methods=['GET'])
 def health_check():
@@ -43,6 +56,13 @@ def not_found(error):
         'message': 'Endpoint not found'
     }), 404
 
+@app.errorhandler(413)
+def request_too_large(error):
+    return jsonify({
+        'status': 'error',
+        'message': f"Request body is larger than {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB"
+    }), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     logger.error(f"Internal server error: {error}")
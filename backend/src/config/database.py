@@ -1,13 +1,153 @@
 import pymysql
 import os
+import time
+import threading
+from collections import deque
 from dotenv import load_dotenv
 import logging
 from contextlib import contextmanager
+from flask import g, has_request_context
+from pymysql.constants import SERVER_STATUS
+from utils.metrics import register_metrics
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+class PoolTimeoutError(pymysql.OperationalError):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of PyMySQL connections.
+
+    At most ``max_size`` physical connections are open at once. Idle
+    connections are reused LIFO so the warmest one is handed out first,
+    pinged when they have been idle longer than ``ping_interval`` and
+    replaced once they are older than ``recycle`` seconds.
+    """
+
+    def __init__(self, connect, max_size: int, recycle: int, timeout: float, ping_interval: float):
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, created_at, last_used_at)
+        self._created_at = {}
+        self._size = 0
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self):
+        """Forget connections inherited from a parent process without closing them"""
+        self._idle.clear()
+        self._created_at.clear()
+        self._size = 0
+        self._pid = os.getpid()
+
+    def acquire(self):
+        """Check a connection out of the pool, opening a new one if allowed"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            while True:
+                if self._idle:
+                    connection, created_at, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"(pool size {self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        if connection is not None:
+            now = time.monotonic()
+            if now - created_at > self.recycle:
+                logger.info("Recycling stale database connection")
+                self._created_at.pop(id(connection), None)
+                self._close_quietly(connection)
+                connection = None
+            elif now - last_used > self.ping_interval:
+                try:
+                    connection.ping(reconnect=False)
+                except Exception as e:
+                    logger.warning(f"Discarding dead pooled connection: {e}")
+                    self._created_at.pop(id(connection), None)
+                    self._close_quietly(connection)
+                    connection = None
+            if connection is not None:
+                return connection
+
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._created_at[id(connection)] = time.monotonic()
+        logger.info("Database connection established successfully")
+        return connection
+
+    def release(self, connection, discard: bool = False):
+        """Return a connection to the pool, or close it if it is no longer usable"""
+        if not discard and connection.open and connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            created_at = self._created_at.get(id(connection), 0)
+            if discard or not connection.open:
+                self._created_at.pop(id(connection), None)
+                self._size -= 1
+                self._close_quietly(connection)
+                logger.info("Database connection closed")
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones are closed on release"""
+        with self._cond:
+            while self._idle:
+                connection, _, _ = self._idle.pop()
+                self._created_at.pop(id(connection), None)
+                self._size -= 1
+                self._close_quietly(connection)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Current pool occupancy"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle)
+            }
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
 class DatabaseConfig:
     """Database configuration for TiDB Cloud"""
     
@@ -30,6 +170,12 @@ class DatabaseConfig:
         self.connect_timeout = int(os.getenv('TIDB_CONNECT_TIMEOUT', '10'))
         self.read_timeout = int(os.getenv('TIDB_READ_TIMEOUT', '30'))
         self.write_timeout = int(os.getenv('TIDB_WRITE_TIMEOUT', '30'))
+        self.pool_timeout = float(os.getenv('TIDB_POOL_TIMEOUT', '10'))
+        self.pool_recycle = int(os.getenv('TIDB_POOL_RECYCLE', '1800'))
+        self.pool_ping_interval = float(os.getenv('TIDB_POOL_PING_INTERVAL', '30'))
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
 
     def get_connection_params(self):
         """Get connection parameters for TiDB Cloud"""
@@ -60,14 +206,48 @@ class DatabaseConfig:
             
         return params
 
+    @property
+    def pool(self) -> ConnectionPool:
+        """Connection pool, created lazily on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        connect=lambda: pymysql.connect(**self.get_connection_params()),
+                        max_size=self.max_connections,
+                        recycle=self.pool_recycle,
+                        timeout=self.pool_timeout,
+                        ping_interval=self.pool_ping_interval
+                    )
+        return self._pool
+
     @contextmanager
     def get_connection(self):
-        """Get a database connection with proper error handling"""
+        """
+        Get a database connection with proper error handling.
+
+        Inside a Flask request every call shares one connection bound to
+        ``g`` until ``release_request_connection`` runs at teardown. The
+        connection stays in autocommit mode; statements that must succeed or
+        fail together belong in a ``transaction()`` block.
+        Outside a request (scripts, background workers) each call checks a
+        connection out of the pool and returns it afterwards.
+        """
+        if has_request_context():
+            with self._request_connection() as connection:
+                yield connection
+            return
+
         connection = None
+        discard = False
         try:
-            connection = pymysql.connect(**self.get_connection_params())
-            logger.info("Database connection established successfully")
+            connection = self.pool.acquire()
             yield connection
+        except (pymysql.OperationalError, pymysql.InterfaceError) as e:
+            # The connection itself may be broken, so never hand it out again
+            logger.error(f"Database connection error: {e}")
+            discard = True
+            raise
         except pymysql.Error as e:
             logger.error(f"Database connection error: {e}")
             if connection:
@@ -80,8 +260,64 @@ class DatabaseConfig:
             raise
         finally:
             if connection:
-                connection.close()
-                logger.info("Database connection closed")
+                self.pool.release(connection, discard=discard)
+
+    @contextmanager
+    def _request_connection(self):
+        """Yield the connection bound to the current request, acquiring it on first use"""
+        connection = g.get('_db_connection')
+        if connection is None:
+            connection = self.pool.acquire()
+            g._db_connection = connection
+
+        try:
+            yield connection
+        except (pymysql.OperationalError, pymysql.InterfaceError) as e:
+            logger.error(f"Database connection error: {e}")
+            # Drop the broken connection so later calls in this request get a fresh one
+            if g.get('_db_connection') is connection:
+                g._db_connection = None
+                self.pool.release(connection, discard=True)
+            raise
+
+    def release_request_connection(self, error: BaseException = None):
+        """
+        Return the request's connection to the pool; later calls in the
+        same request check out a new one.
+
+        Registered as a ``teardown_request`` handler; routes may also call it
+        before long LLM calls so the connection isn't held while waiting.
+        A transaction still open at this point was never committed by its
+        ``transaction()`` block, so it is rolled back.
+        """
+        if not has_request_context():
+            return
+        connection = g.get('_db_connection')
+        if connection is None:
+            return
+        g._db_connection = None
+
+        self.pool.release(connection)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the enclosed statements in one transaction.
+
+        Nested use joins the outer transaction instead of committing early.
+        """
+        with self.get_connection() as connection:
+            if connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                yield connection
+                return
+
+            connection.begin()
+            try:
+                yield connection
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
 
     def test_connection(self):
         """Test database connection"""
@@ -98,3 +334,4 @@ class DatabaseConfig:
 
 # Global database config instance
 db_config = DatabaseConfig()
+register_metrics('db_pool', lambda: db_config.pool.stats())
@@ -30,7 +30,8 @@ CREATE TABLE IF NOT EXISTS resumes (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user_id (user_id),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_user_created (user_id, created_at)
 );
 
 -- Job descriptions table to store parsed job posting data
@@ -48,7 +49,8 @@ CREATE TABLE IF NOT EXISTS job_descriptions (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user_id (user_id),
     INDEX idx_company (company),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_user_created (user_id, created_at)
 );
 
 -- AI suggestions table to store AI-generated recommendations
@@ -62,6 +64,8 @@ CREATE TABLE IF NOT EXISTS ai_suggestions (
     content TEXT NOT NULL,
     priority ENUM('low', 'medium', 'high') DEFAULT 'medium',
     is_read BOOLEAN DEFAULT FALSE,
+    analysis_run_id VARCHAR(32),
+    is_superseded BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -71,7 +75,8 @@ CREATE TABLE IF NOT EXISTS ai_suggestions (
     INDEX idx_suggestion_type (suggestion_type),
     INDEX idx_priority (priority),
     INDEX idx_is_read (is_read),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_user_live_priority_created (user_id, is_superseded, priority, created_at)
 );
 
 -- Job applications tracking table
@@ -156,9 +161,49 @@ CREATE TABLE IF NOT EXISTS user_sessions (
     user_id BIGINT NOT NULL,
     session_token VARCHAR(255) UNIQUE NOT NULL,
     expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user_id (user_id),
     INDEX idx_session_token (session_token),
-    INDEX idx_expires_at (expires_at)
+    INDEX idx_expires_at (expires_at),
+    INDEX idx_revoked_at (revoked_at)
+);
+
+-- Background jobs table for long-running work such as gap analyses
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    status ENUM('queued', 'running', 'succeeded', 'failed') DEFAULT 'queued',
+    progress INT DEFAULT 0,
+    stage VARCHAR(255),
+    result JSON,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_user_id (user_id),
+    INDEX idx_created_at (created_at)
+);
+
+-- Migrations for databases created before the columns/indexes above existed
+ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS revoked_at TIMESTAMP NULL;
+CREATE INDEX IF NOT EXISTS idx_revoked_at ON user_sessions (revoked_at);
+ALTER TABLE ai_suggestions ADD COLUMN IF NOT EXISTS analysis_run_id VARCHAR(32);
+ALTER TABLE ai_suggestions ADD COLUMN IF NOT EXISTS is_superseded BOOLEAN DEFAULT FALSE;
+-- idx_user_priority_created was replaced by idx_user_live_priority_created,
+-- so drop it where an earlier version of this migration created it
+SET @drop_old_index = (
+    SELECT IF(COUNT(*) > 0, 'DROP INDEX idx_user_priority_created ON ai_suggestions', 'DO 0')
+    FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'ai_suggestions'
+      AND index_name = 'idx_user_priority_created'
 );
+PREPARE drop_old_index FROM @drop_old_index;
+EXECUTE drop_old_index;
+DEALLOCATE PREPARE drop_old_index;
+CREATE INDEX IF NOT EXISTS idx_user_live_priority_created ON ai_suggestions (user_id, is_superseded, priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_user_created ON resumes (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_user_created ON job_descriptions (user_id, created_at);
@@ -3,13 +3,34 @@ AI Suggestion model for database operations
 Handles AI-generated suggestions storage and retrieval
 """
 
+import base64
+import json
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from config.database import db_config
 
 logger = logging.getLogger(__name__)
 
+# Position of each value in the priority ENUM; ENUM columns sort and compare
+# numerically against integers by this position
+PRIORITY_RANK = {'low': 1, 'medium': 2, 'high': 3}
+
+
+def normalize_priority(priority: Any) -> str:
+    """Map a free-text priority (e.g. an LLM's "Critical") onto the ENUM, defaulting to medium"""
+    priority = str(priority or '').strip().lower()
+    return priority if priority in PRIORITY_RANK else 'medium'
+
+
+SUGGESTION_COLUMNS = ['id', 'resume_id', 'job_description_id', 'suggestion_type', 'title', 'content',
+                      'priority', 'is_read', 'created_at']
+
+# Types written by gap analyses; rows of these types created before runs were
+# tracked (analysis_run_id NULL) are treated as belonging to an earlier run
+ANALYSIS_SUGGESTION_TYPES = ('skills_to_improve', 'strengths', 'recommendations', 'suggestions',
+                             'summary', 'conclusion')
+
 class AISuggestionModel:
     """AI Suggestion model for database operations"""
     
@@ -50,22 +71,104 @@ class AISuggestionModel:
             logger.error(f"Error creating AI suggestion: {e}")
             return None
     
+    @staticmethod
+    def create_suggestions_bulk(user_id: int, suggestions: List[Dict[str, Any]],
+                                resume_id: Optional[int] = None,
+                                job_description_id: Optional[int] = None,
+                                analysis_run_id: Optional[str] = None) -> Optional[List[int]]:
+        """
+        Create many AI suggestions with one multi-row INSERT in a single transaction.
+        Each item needs suggestion_type, title and content; a missing or unknown priority
+        is stored as medium, so one bad value can't fail the whole batch.
+        With an analysis_run_id, earlier runs for the same resume/job pair (including
+        analysis rows from before runs were tracked) are marked superseded in the same
+        transaction, so readers switch to the new run atomically.
+        Returns the new ids in input order, or None on failure
+        """
+        if not suggestions:
+            return []
+        
+        try:
+            with db_config.transaction() as conn:
+                with conn.cursor() as cursor:
+                    if analysis_run_id:
+                        type_placeholders = ", ".join(["%s"] * len(ANALYSIS_SUGGESTION_TYPES))
+                        cursor.execute(f"""
+                        UPDATE ai_suggestions
+                        SET is_superseded = TRUE
+                        WHERE user_id = %s AND resume_id <=> %s AND job_description_id <=> %s
+                          AND is_superseded = FALSE
+                          AND (analysis_run_id IS NOT NULL OR suggestion_type IN ({type_placeholders}))
+                        """, (user_id, resume_id, job_description_id, *ANALYSIS_SUGGESTION_TYPES))
+                        if cursor.rowcount:
+                            logger.info(f"Superseded {cursor.rowcount} suggestions from earlier analyses for user {user_id}")
+                    
+                    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(suggestions))
+                    query = f"""
+                    INSERT INTO ai_suggestions (user_id, resume_id, job_description_id, suggestion_type, title, content, priority, analysis_run_id)
+                    VALUES {placeholders}
+                    """
+                    
+                    params = []
+                    for suggestion in suggestions:
+                        params.extend([
+                            user_id, resume_id, job_description_id, suggestion['suggestion_type'],
+                            suggestion['title'], suggestion['content'], normalize_priority(suggestion.get('priority')),
+                            analysis_run_id
+                        ])
+                    
+                    cursor.execute(query, params)
+                    
+                    # lastrowid is the first id of the batch; ids allocated by one
+                    # INSERT statement are consecutive in TiDB and MySQL
+                    first_id = cursor.lastrowid
+                    return list(range(first_id, first_id + len(suggestions)))
+                    
+        except Exception as e:
+            logger.error(f"Error bulk creating AI suggestions: {e}")
+            return None
+    
     @staticmethod
     def get_suggestions_by_user(user_id: int, suggestion_type: Optional[str] = None, 
-                               is_read: Optional[bool] = None) -> List[Dict[str, Any]]:
-        """Get AI suggestions for a user with optional filters"""
+                               is_read: Optional[bool] = None, limit: Optional[int] = None,
+                               include_content: bool = True,
+                               include_superseded: bool = False) -> List[Dict[str, Any]]:
+        """Get AI suggestions for a user with optional filters, highest priority first; limit keeps the top N"""
+        return AISuggestionModel.get_suggestions_page(
+            user_id, suggestion_type=suggestion_type, is_read=is_read,
+            limit=limit, include_content=include_content, include_superseded=include_superseded
+        )['suggestions']
+    
+    @staticmethod
+    def get_suggestions_page(user_id: int, suggestion_type: Optional[str] = None,
+                             is_read: Optional[bool] = None, limit: Optional[int] = None,
+                             cursor: Optional[str] = None, include_content: bool = True,
+                             include_superseded: bool = False) -> Dict[str, Any]:
+        """
+        Get one page of AI suggestions ordered by priority, then newest first.
+        Only the live set (suggestions from the latest analysis of each resume/job
+        pair, plus manual ones) is returned unless include_superseded is set.
+        Pass the returned next_cursor back to continue after the last row; the
+        (user_id, is_superseded, priority, created_at) index serves both the filter
+        and the order. Raises ValueError for a malformed cursor
+        """
+        after = AISuggestionModel.decode_cursor(cursor) if cursor else None
+        columns = SUGGESTION_COLUMNS if include_content else [c for c in SUGGESTION_COLUMNS if c != 'content']
+        
         try:
             with db_config.get_connection() as conn:
-                with conn.cursor() as cursor:
+                with conn.cursor() as db_cursor:
                     # Build dynamic query based on filters
-                    base_query = """
-                    SELECT id, resume_id, job_description_id, suggestion_type, title, content, 
-                           priority, is_read, created_at
+                    base_query = f"""
+                    SELECT {', '.join(columns)}
                     FROM ai_suggestions 
                     WHERE user_id = %s
                     """
                     params = [user_id]
                     
+                    if not include_superseded:
+                        base_query += " AND is_superseded = FALSE"
+                    
                     if suggestion_type:
                         base_query += " AND suggestion_type = %s"
                         params.append(suggestion_type)
@@ -74,31 +177,56 @@ class AISuggestionModel:
                         base_query += " AND is_read = %s"
                         params.append(is_read)
                     
-                    base_query += " ORDER BY priority DESC, created_at DESC"
+                    if after:
+                        rank, created_at, last_id = after
+                        base_query += """
+                        AND (priority < %s
+                             OR (priority = %s AND (created_at < %s
+                                                    OR (created_at = %s AND id < %s))))
+                        """
+                        params.extend([rank, rank, created_at, created_at, last_id])
                     
-                    cursor.execute(base_query, params)
-                    results = cursor.fetchall()
+                    base_query += " ORDER BY priority DESC, created_at DESC, id DESC"
                     
-                    suggestions = []
-                    for result in results:
-                        suggestion = {
-                            'id': result[0],
-                            'resume_id': result[1],
-                            'job_description_id': result[2],
-                            'suggestion_type': result[3],
-                            'title': result[4],
-                            'content': result[5],
-                            'priority': result[6],
-                            'is_read': result[7],
-                            'created_at': result[8]
-                        }
-                        suggestions.append(suggestion)
+                    if limit:
+                        # One extra row tells us whether another page exists
+                        base_query += " LIMIT %s"
+                        params.append(limit + 1)
+                    
+                    db_cursor.execute(base_query, params)
+                    results = db_cursor.fetchall()
+                    
+                    suggestions = [dict(zip(columns, result)) for result in results]
+                    
+                    next_cursor = None
+                    if limit and len(suggestions) > limit:
+                        suggestions = suggestions[:limit]
+                        next_cursor = AISuggestionModel.encode_cursor(suggestions[-1])
                     
-                    return suggestions
+                    return {'suggestions': suggestions, 'next_cursor': next_cursor}
                     
         except Exception as e:
             logger.error(f"Error getting AI suggestions by user: {e}")
-            return []
+            return {'suggestions': [], 'next_cursor': None}
+    
+    @staticmethod
+    def encode_cursor(suggestion: Dict[str, Any]) -> str:
+        """Opaque cursor pointing just after the given suggestion"""
+        created_at = suggestion['created_at']
+        if isinstance(created_at, datetime):
+            created_at = created_at.strftime('%Y-%m-%d %H:%M:%S')
+        key = [PRIORITY_RANK.get(suggestion['priority'], 0), created_at, suggestion['id']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, str, int]:
+        """Inverse of encode_cursor; raises ValueError for anything it didn't produce"""
+        try:
+            rank, created_at, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S')
+            return int(rank), created_at, int(last_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
     
     @staticmethod
     def get_suggestion_by_id(suggestion_id: int, user_id: int) -> Optional[Dict[str, Any]]:
@@ -197,7 +325,7 @@ class AISuggestionModel:
                         SUM(CASE WHEN is_read = FALSE THEN 1 ELSE 0 END) as unread,
                         SUM(CASE WHEN priority = 'high' AND is_read = FALSE THEN 1 ELSE 0 END) as high_priority_unread
                     FROM ai_suggestions 
-                    WHERE user_id = %s
+                    WHERE user_id = %s AND is_superseded = FALSE
                     """
                     cursor.execute(query, (user_id,))
                     result = cursor.fetchone()
@@ -210,4 +338,26 @@ class AISuggestionModel:
                     
         except Exception as e:
             logger.error(f"Error getting suggestion stats: {e}")
-            return {'total': 0, 'unread': 0, 'high_priority_unread': 0}
\ No newline at end of file
+            return {'total': 0, 'unread': 0, 'high_priority_unread': 0}
+    
+    @staticmethod
+    def purge_superseded(older_than_days: int, batch_size: int = 1000) -> int:
+        """Delete suggestions superseded more than older_than_days ago, in batches; returns rows removed"""
+        removed = 0
+        try:
+            while True:
+                with db_config.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        query = """
+                        DELETE FROM ai_suggestions
+                        WHERE is_superseded = TRUE AND updated_at < NOW() - INTERVAL %s DAY
+                        LIMIT %s
+                        """
+                        cursor.execute(query, (older_than_days, batch_size))
+                        removed += cursor.rowcount
+                        if cursor.rowcount < batch_size:
+                            return removed
+                    
+        except Exception as e:
+            logger.error(f"Error purging superseded AI suggestions: {e}")
+            return removed
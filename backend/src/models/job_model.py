@@ -0,0 +1,128 @@
+"""
+Background job model for database operations
+Tracks status and progress of long-running jobs such as gap analyses
+"""
+
+import json
+import logging
+import os
+from typing import Optional, Dict, Any
+from config.database import db_config
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# Jobs live in one server process's memory and running jobs refresh updated_at
+# as a heartbeat (see job_queue.start_heartbeat); a running job whose row hasn't
+# changed for this long was lost with its process (restart, recycle)
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '900'))
+
+
+class JobModel:
+    """Background job model for database operations"""
+
+    @staticmethod
+    def create_job(job_id: str, user_id: int, kind: str, stage: str = None) -> bool:
+        """Record a newly queued job"""
+        try:
+            with db_config.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    query = """
+                    INSERT INTO background_jobs (id, user_id, kind, status, progress, stage)
+                    VALUES (%s, %s, %s, 'queued', 0, %s)
+                    """
+                    cursor.execute(query, (job_id, user_id, kind, stage))
+                    return True
+
+        except Exception as e:
+            logger.error(f"Error creating job: {e}")
+            return False
+
+    @staticmethod
+    def update_job(job_id: str, status: str = None, progress: int = None, stage: str = None,
+                   result: Dict[str, Any] = None, error: str = None) -> bool:
+        """Update the given fields of a job; finished jobs also get finished_at"""
+        fields = []
+        values = []
+        if status is not None:
+            fields.append("status = %s")
+            values.append(status)
+            if status in ('succeeded', 'failed'):
+                fields.append("finished_at = CURRENT_TIMESTAMP")
+        if progress is not None:
+            fields.append("progress = %s")
+            values.append(progress)
+        if stage is not None:
+            fields.append("stage = %s")
+            values.append(stage)
+        if result is not None:
+            fields.append("result = %s")
+            values.append(json.dumps(result, default=str))
+        if error is not None:
+            fields.append("error = %s")
+            values.append(error)
+
+        if not fields:
+            return False
+
+        try:
+            with db_config.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    query = f"UPDATE background_jobs SET {', '.join(fields)} WHERE id = %s"
+                    cursor.execute(query, values + [job_id])
+                    return cursor.rowcount > 0
+
+        except Exception as e:
+            logger.error(f"Error updating job {job_id}: {e}")
+            return False
+
+    @staticmethod
+    def touch_job(job_id: str) -> bool:
+        """Refresh a running job's updated_at so it isn't taken for a lost one"""
+        try:
+            with db_config.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    query = """
+                    UPDATE background_jobs SET updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s AND status = 'running'
+                    """
+                    cursor.execute(query, (job_id,))
+                    return cursor.rowcount > 0
+
+        except Exception as e:
+            logger.error(f"Error touching job {job_id}: {e}")
+            return False
+
+    @staticmethod
+    def get_job(job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a job owned by the user, failing it first if it stopped heartbeating"""
+        try:
+            with db_config.get_connection() as conn:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    query = """
+                    UPDATE background_jobs
+                    SET status = 'failed', stage = 'Failed', finished_at = CURRENT_TIMESTAMP,
+                        error = 'Job was interrupted, please try again'
+                    WHERE id = %s AND user_id = %s AND status = 'running'
+                      AND updated_at < NOW() - INTERVAL %s SECOND
+                    """
+                    cursor.execute(query, (job_id, user_id, JOB_STALE_AFTER))
+                    if cursor.rowcount:
+                        logger.warning(f"Marked stale job {job_id} as failed")
+
+                    query = """
+                    SELECT id, kind, status, progress, stage, result, error,
+                           created_at, updated_at, finished_at
+                    FROM background_jobs
+                    WHERE id = %s AND user_id = %s
+                    """
+                    cursor.execute(query, (job_id, user_id))
+                    job = cursor.fetchone()
+
+                    if job and job['result']:
+                        job['result'] = json.loads(job['result'])
+                    return job
+
+        except Exception as e:
+            logger.error(f"Error getting job {job_id}: {e}")
+            return None
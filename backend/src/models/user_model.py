@@ -3,29 +3,66 @@ User model for database operations
 Handles user authentication, registration, and profile management
 """
 
-import bcrypt
+import hashlib
+import os
+import re
 import secrets
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from config.database import db_config
+from utils.ttl_cache import TTLCache, MISSING
+from utils.session_tokens import SessionTokenSigner, RevocationList
+from utils.metrics import register_metrics
+from utils.password_hasher import password_hasher, HasherBusyError
 
 logger = logging.getLogger(__name__)
 
+# Validated sessions are cached per process, keyed by a hash of the token.
+# Well-formed but invalid tokens are remembered briefly in a separate, smaller
+# cache, so floods of bad tokens skip the database without evicting real sessions.
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '60'))
+SESSION_NEGATIVE_CACHE_TTL = float(os.getenv('SESSION_NEGATIVE_CACHE_TTL', '5'))
+_session_cache = TTLCache(
+    maxsize=int(os.getenv('SESSION_CACHE_SIZE', '10000')),
+    ttl=SESSION_CACHE_TTL
+)
+_invalid_session_cache = TTLCache(
+    maxsize=int(os.getenv('SESSION_NEGATIVE_CACHE_SIZE', '1000')),
+    ttl=SESSION_NEGATIVE_CACHE_TTL
+)
+register_metrics('session_cache', _session_cache.stats)
+register_metrics('session_negative_cache', _invalid_session_cache.stats)
+
+# Opaque session tokens are secrets.token_urlsafe(32); anything else can't match a row
+OPAQUE_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]{43}')
+
+def _session_cache_key(session_token: str) -> str:
+    return hashlib.sha256(session_token.encode('utf-8')).hexdigest()
+
+# SESSION_TOKEN_MODE=signed issues HMAC-signed tokens that are verified without
+# touching the database; user_sessions rows then only back the revocation list.
+SESSION_TOKEN_MODE = os.getenv('SESSION_TOKEN_MODE', 'opaque').lower()
+SIGNED_SESSION_PREFIX = 'sig.'
+_token_signer = None
+if SESSION_TOKEN_MODE == 'signed':
+    if os.getenv('SESSION_SIGNING_KEY'):
+        _token_signer = SessionTokenSigner(os.getenv('SESSION_SIGNING_KEY'))
+    else:
+        logger.error("SESSION_TOKEN_MODE=signed requires SESSION_SIGNING_KEY; falling back to opaque tokens")
+
 class UserModel:
     """User model for database operations"""
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        """Hash a password using bcrypt on the bounded hashing pool"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        """Verify a password against its hash on the bounded hashing pool"""
+        return password_hasher.verify(password, hashed_password)
     
     @staticmethod
     def create_user(email: str, password: str, first_name: str, last_name: str) -> Optional[Dict[str, Any]]:
@@ -57,6 +94,8 @@ class UserModel:
                         'created_at': datetime.now()
                     }
                     
+        except HasherBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error creating user: {e}")
             return None
@@ -138,38 +177,91 @@ class UserModel:
                 'created_at': user['created_at']
             }
             
+        except HasherBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error authenticating user: {e}")
             return None
     
     @staticmethod
-    def create_session(user_id: int) -> Optional[str]:
+    def create_session(user_id: int, user: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """Create a new user session"""
         try:
             session_token = secrets.token_urlsafe(32)
             expires_at = datetime.now() + timedelta(days=7)  # 7 days expiration
             
+            if _token_signer:
+                user = user or UserModel.get_user_by_id(user_id)
+                if not user:
+                    return None
+                # The row stores only the session id; the client gets the signed token
+                stored_token = SIGNED_SESSION_PREFIX + session_token
+                session_token = _token_signer.issue(user, stored_token, expires_at)
+            else:
+                stored_token = session_token
+            
             with db_config.get_connection() as conn:
                 with conn.cursor() as cursor:
                     query = """
                     INSERT INTO user_sessions (user_id, session_token, expires_at)
                     VALUES (%s, %s, %s)
                     """
-                    cursor.execute(query, (user_id, session_token, expires_at))
+                    cursor.execute(query, (user_id, stored_token, expires_at))
                     return session_token
                     
         except Exception as e:
             logger.error(f"Error creating session: {e}")
             return None
     
+    @staticmethod
+    def get_revoked_session_ids() -> Optional[List[str]]:
+        """
+        Get ids of unexpired signed sessions that must no longer be accepted:
+        those revoked before they expired and those of deactivated users
+        """
+        try:
+            with db_config.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    query = """
+                    SELECT s.session_token FROM user_sessions s
+                    JOIN users u ON u.id = s.user_id
+                    WHERE s.expires_at > NOW()
+                      AND s.session_token LIKE %s
+                      AND (s.revoked_at IS NOT NULL OR u.is_active = FALSE)
+                    """
+                    cursor.execute(query, (SIGNED_SESSION_PREFIX + '%',))
+                    return [row[0] for row in cursor.fetchall()]
+                    
+        except Exception as e:
+            logger.error(f"Error loading revoked sessions: {e}")
+            return None
+    
     @staticmethod
     def validate_session(session_token: str) -> Optional[Dict[str, Any]]:
         """Validate a session token and return user data"""
+        if _token_signer and SessionTokenSigner.is_signed_token(session_token):
+            payload = _token_signer.decode(session_token)
+            if not payload or _revocation_list.is_revoked(payload['sid']):
+                return None
+            return SessionTokenSigner.user_from_payload(payload)
+        
+        # Session ids of signed tokens must never work as bearer tokens themselves,
+        # and malformed tokens are rejected without a lookup or a cache entry
+        if not OPAQUE_TOKEN_PATTERN.fullmatch(session_token):
+            return None
+        
+        cache_key = _session_cache_key(session_token)
+        cached = _session_cache.get(cache_key)
+        if cached is not MISSING:
+            return dict(cached)
+        if _invalid_session_cache.get(cache_key) is not MISSING:
+            return None
+        
         try:
             with db_config.get_connection() as conn:
                 with conn.cursor() as cursor:
                     query = """
-                    SELECT u.id, u.email, u.first_name, u.last_name, u.created_at
+                    SELECT u.id, u.email, u.first_name, u.last_name, u.created_at, s.expires_at
                     FROM users u
                     JOIN user_sessions s ON u.id = s.user_id
                     WHERE s.session_token = %s AND s.expires_at > NOW() AND u.is_active = TRUE
@@ -178,13 +270,20 @@ class UserModel:
                     result = cursor.fetchone()
                     
                     if result:
-                        return {
+                        user = {
                             'id': result[0],
                             'email': result[1],
                             'first_name': result[2],
                             'last_name': result[3],
                             'created_at': result[4]
                         }
+                        # Never cache a session past its own expiry
+                        ttl = min(SESSION_CACHE_TTL, (result[5] - datetime.now()).total_seconds())
+                        if ttl > 0:
+                            _session_cache.set(cache_key, user, ttl=ttl)
+                        return dict(user)
+                    
+                    _invalid_session_cache.set(cache_key, True)
                     return None
                     
         except Exception as e:
@@ -194,6 +293,10 @@ class UserModel:
     @staticmethod
     def delete_session(session_token: str) -> bool:
         """Delete a session token"""
+        if _token_signer and SessionTokenSigner.is_signed_token(session_token):
+            return UserModel._revoke_signed_session(session_token)
+        
+        _session_cache.pop(_session_cache_key(session_token))
         try:
             with db_config.get_connection() as conn:
                 with conn.cursor() as cursor:
@@ -204,3 +307,33 @@ class UserModel:
         except Exception as e:
             logger.error(f"Error deleting session: {e}")
             return False
+    
+    @staticmethod
+    def _revoke_signed_session(session_token: str) -> bool:
+        """Mark a signed session revoked so every replica rejects it"""
+        payload = _token_signer.decode(session_token, verify_expiry=False)
+        if not payload:
+            return False
+        
+        try:
+            with db_config.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    query = """
+                    UPDATE user_sessions SET revoked_at = NOW()
+                    WHERE session_token = %s AND revoked_at IS NULL
+                    """
+                    cursor.execute(query, (payload['sid'],))
+                    revoked = cursor.rowcount > 0
+            
+            _revocation_list.add(payload['sid'])
+            return revoked
+                    
+        except Exception as e:
+            logger.error(f"Error revoking session: {e}")
+            return False
+
+
+_revocation_list = RevocationList(
+    loader=UserModel.get_revoked_session_ids,
+    refresh_interval=float(os.getenv('SESSION_REVOCATION_REFRESH', '30'))
+)
@@ -107,14 +107,21 @@ class WorkplaceModel:
             return None
     
     @staticmethod
-    def get_workplaces_by_user(user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get all workplaces for a user, ordered by last updated date (newest first)"""
+    def get_workplaces_by_user(user_id: int, limit: int = 50, include_analysis: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get all workplaces for a user, ordered by last updated date (newest first).
+        Returns a summary with a has_analysis flag; the analysis_data blob is only
+        read and decoded when include_analysis is set (get_workplace_by_id has it too)
+        """
         try:
             with db_config.get_connection() as conn:
                 with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    query = """
+                    query = f"""
                     SELECT 
-                        w.*,
+                        w.id, w.user_id, w.name, w.description, w.resume_id, w.job_description_id,
+                        w.created_at, w.updated_at,
+                        w.analysis_data IS NOT NULL as has_analysis,
+                        {'w.analysis_data,' if include_analysis else ''}
                         r.filename as resume_filename,
                         jd.title as job_title,
                         jd.company as job_company
@@ -131,20 +138,23 @@ class WorkplaceModel:
                     
                     workplaces = []
                     for result in results:
-                        workplaces.append({
+                        workplace = {
                             'id': result['id'],
                             'user_id': result['user_id'],
                             'name': result['name'],
                             'description': result['description'],
                             'resume_id': result['resume_id'],
                             'job_description_id': result['job_description_id'],
-                            'analysis_data': json.loads(result['analysis_data']) if result['analysis_data'] else None,
+                            'has_analysis': bool(result['has_analysis']),
                             'created_at': result['created_at'],
                             'updated_at': result['updated_at'],
                             'resume_filename': result['resume_filename'],
                             'job_title': result['job_title'],
                             'job_company': result['job_company']
-                        })
+                        }
+                        if include_analysis:
+                            workplace['analysis_data'] = json.loads(result['analysis_data']) if result['analysis_data'] else None
+                        workplaces.append(workplace)
                     
                     return workplaces
                     
@@ -154,33 +164,47 @@ class WorkplaceModel:
     
     @staticmethod
     def get_latest_resume_and_job_description(user_id: int) -> Dict[str, Any]:
-        """Get the latest resume and job description for a user"""
+        """
+        Get the latest resume and job description for a user in one round trip.
+        Only ids, labels and parsed_data are read; each branch is an index seek on
+        (user_id, created_at)
+        """
         try:
             with db_config.get_connection() as conn:
                 with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                    # Get latest resume
-                    resume_query = """
-                    SELECT * FROM resumes 
-                    WHERE user_id = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT 1
+                    query = """
+                    (SELECT 'resume' as kind, id, filename as label, NULL as company, parsed_data, created_at
+                     FROM resumes
+                     WHERE user_id = %s
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT 1)
+                    UNION ALL
+                    (SELECT 'job_description' as kind, id, title as label, company, parsed_data, created_at
+                     FROM job_descriptions
+                     WHERE user_id = %s
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT 1)
                     """
-                    cursor.execute(resume_query, (user_id,))
-                    latest_resume = cursor.fetchone()
+                    cursor.execute(query, (user_id, user_id))
+                    rows = {row['kind']: row for row in cursor.fetchall()}
                     
-                    # Get latest job description
-                    job_query = """
-                    SELECT * FROM job_descriptions 
-                    WHERE user_id = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT 1
-                    """
-                    cursor.execute(job_query, (user_id,))
-                    latest_job = cursor.fetchone()
+                    latest_resume = rows.get('resume')
+                    latest_job = rows.get('job_description')
                     
                     return {
-                        'resume': dict(latest_resume) if latest_resume else None,
-                        'job_description': dict(latest_job) if latest_job else None
+                        'resume': {
+                            'id': latest_resume['id'],
+                            'filename': latest_resume['label'],
+                            'parsed_data': latest_resume['parsed_data'],
+                            'created_at': latest_resume['created_at']
+                        } if latest_resume else None,
+                        'job_description': {
+                            'id': latest_job['id'],
+                            'title': latest_job['label'],
+                            'company': latest_job['company'],
+                            'parsed_data': latest_job['parsed_data'],
+                            'created_at': latest_job['created_at']
+                        } if latest_job else None
                     }
                     
         except Exception as e:
@@ -0,0 +1,90 @@
+"""
+Operational endpoints for administrators
+Guarded by the ADMIN_API_TOKEN shared secret
+"""
+
+import hmac
+import os
+from functools import wraps
+
+from flask import Blueprint, jsonify, request
+
+from utils.metrics import collect_metrics
+from utils.model_health import model_health
+from models.ai_suggestion_model import AISuggestionModel
+
+admin_bp = Blueprint('admin', __name__)
+
+
+def require_admin(view):
+    """Allow the request only when X-Admin-Token matches ADMIN_API_TOKEN"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = os.getenv('ADMIN_API_TOKEN')
+        if not expected:
+            # Admin endpoints are disabled unless a token is configured
+            return jsonify({
+                'status': 'error',
+                'message': 'Endpoint not found'
+            }), 404
+
+        provided = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(provided.encode('utf-8'), expected.encode('utf-8')):
+            return jsonify({
+                'status': 'error',
+                'message': 'Admin token required'
+            }), 403
+
+        return view(*args, **kwargs)
+    return wrapper
+
+
+#   Process metrics
+@admin_bp.route('/metrics', methods=['GET'])
+@require_admin
+def get_metrics():
+    """
+    Snapshot of in-process metrics (auth latency, pools, caches)
+    """
+    return jsonify({
+        'status': 'success',
+        'metrics': collect_metrics()
+    }), 200
+
+
+#   LLM model health
+@admin_bp.route('/models', methods=['GET'])
+@require_admin
+def get_model_health():
+    """
+    Circuit-breaker state, error counts and latency percentiles per LLM model
+    """
+    return jsonify({
+        'status': 'success',
+        'models': model_health.scoreboard()
+    }), 200
+
+
+#   Maintenance
+@admin_bp.route('/suggestions/purge-superseded', methods=['POST'])
+@require_admin
+def purge_superseded_suggestions():
+    """
+    Delete AI suggestions replaced by a newer analysis more than ?days= ago
+    (default SUGGESTION_SUPERSEDED_RETENTION_DAYS)
+    """
+    try:
+        days = int(request.args.get('days', os.getenv('SUGGESTION_SUPERSEDED_RETENTION_DAYS', '30')))
+    except ValueError:
+        days = -1
+    if days < 0:
+        return jsonify({
+            'status': 'error',
+            'message': 'days must be a non-negative integer'
+        }), 400
+
+    removed = AISuggestionModel.purge_superseded(days)
+    return jsonify({
+        'status': 'success',
+        'removed': removed
+    }), 200
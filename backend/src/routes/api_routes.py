@@ -1,218 +1,117 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
+from werkzeug.exceptions import RequestEntityTooLarge
 import json
 import logging
+import uuid
 from datetime import datetime
 
-from utils.groq_llama_parser import parse_resume, parse_job_description
-from utils.pdf_extractor import extract_text_from_pdf
+from utils.groq_llama_parser import parse_resume_pdf, parse_job_description
+from utils.pdf_extractor import spool_pdf_upload, PDFLimitError, InvalidPDFError, PDF_MAX_BYTES, PDF_MAX_PAGES
 from models.user_model import UserModel
 from models.resume_model import ResumeModel
 from models.job_description_model import JobDescriptionModel
 from models.ai_suggestion_model import AISuggestionModel
 from models.workplace_model import WorkplaceModel
 from models.goals_model import GoalsModel, TaskCompletionModel
+from models.job_model import JobModel
+from config.database import db_config
+from routes.auth import require_user, get_bearer_token
+from utils.password_hasher import HasherBusyError
+from utils.job_queue import job_queue, start_heartbeat, JobQueueFullError
+from utils.sse import format_sse, sse_response
 
-def create_suggestions_from_analysis(user_id: int, analysis_data: dict, resume_id: int, job_description_id: int):
-    """Create AI suggestions from analysis data"""
-    try:
-        # Create skill improvement suggestions
-        if 'skillsToImprove' in analysis_data and analysis_data['skillsToImprove']:
-            for skill in analysis_data['skillsToImprove']:
-                title = f"Improve {skill.get('name', 'Unknown Skill')}"
-                content = f"Current Level: {skill.get('current', 0)}% | Target Level: {skill.get('target', 100)}%\n\nSuggestion: {skill.get('suggestion', 'No specific suggestion provided')}"
-                priority = skill.get('urgency', 'medium').lower()
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='skills_to_improve',
-                    title=title,
-                    content=content,
-                    priority=priority
-                )
-        
-        # Create strength suggestions
-        if 'strengths' in analysis_data and analysis_data['strengths']:
-            for i, strength in enumerate(analysis_data['strengths']):
-                title = f"Strength: {strength}"
-                content = f"You have strong skills in {strength}. Consider highlighting this in your resume and interviews."
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='strengths',
-                    title=title,
-                    content=content,
-                    priority='low'
-                )
-        
-        # Create recommendation suggestions
-        if 'recommendations' in analysis_data and analysis_data['recommendations']:
-            for i, recommendation in enumerate(analysis_data['recommendations']):
-                title = f"Career Recommendation {i+1}"
-                content = recommendation
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='recommendations',
-                    title=title,
-                    content=content,
-                    priority='medium'
-                )
-        
-        # Create general suggestions
-        if 'suggestions' in analysis_data and analysis_data['suggestions']:
-            for i, suggestion in enumerate(analysis_data['suggestions']):
-                title = f"Learning Suggestion {i+1}"
-                content = suggestion
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='suggestions',
-                    title=title,
-                    content=content,
-                    priority='low'
-                )
-        
-        # Create summary suggestion
-        if 'summary' in analysis_data and analysis_data['summary']:
-            AISuggestionModel.create_suggestion(
-                user_id=user_id,
-                resume_id=resume_id,
-                job_description_id=job_description_id,
-                suggestion_type='summary',
-                title='Analysis Summary',
-                content=analysis_data['summary'],
-                priority='high'
-            )
-        
-        # Create conclusion suggestion
-        if 'conclusion' in analysis_data and analysis_data['conclusion']:
-            AISuggestionModel.create_suggestion(
-                user_id=user_id,
-                resume_id=resume_id,
-                job_description_id=job_description_id,
-                suggestion_type='conclusion',
-                title='Career Conclusion',
-                content=analysis_data['conclusion'],
-                priority='medium'
-            )
-            
-    except Exception as e:
-        logger.error(f"Error creating suggestions from analysis: {e}")
-        raise e
-
-from ai_modules.agents.roadmap_agent import create_study_plan
+from ai_modules.agents.roadmap_agent import create_study_plan, stream_study_plan
 
 def create_suggestions_from_analysis(user_id: int, analysis_data: dict, resume_id: int, job_description_id: int):
-    """Create AI suggestions from analysis data"""
+    """Create AI suggestions from analysis data with a single bulk insert"""
     try:
+        suggestions = []
+        
         # Create skill improvement suggestions
         if 'skillsToImprove' in analysis_data and analysis_data['skillsToImprove']:
             for skill in analysis_data['skillsToImprove']:
-                title = f"Improve {skill.get('name', 'Unknown Skill')}"
-                content = f"Current Level: {skill.get('current', 0)}% | Target Level: {skill.get('target', 100)}%\n\nSuggestion: {skill.get('suggestion', 'No specific suggestion provided')}"
-                priority = skill.get('urgency', 'medium').lower()
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='skills_to_improve',
-                    title=title,
-                    content=content,
-                    priority=priority
-                )
+                suggestions.append({
+                    'suggestion_type': 'skills_to_improve',
+                    'title': f"Improve {skill.get('name', 'Unknown Skill')}",
+                    'content': f"Current Level: {skill.get('current', 0)}% | Target Level: {skill.get('target', 100)}%\n\nSuggestion: {skill.get('suggestion', 'No specific suggestion provided')}",
+                    'priority': skill.get('urgency', 'medium').lower()
+                })
         
         # Create strength suggestions
         if 'strengths' in analysis_data and analysis_data['strengths']:
-            for i, strength in enumerate(analysis_data['strengths']):
-                title = f"Strength: {strength}"
-                content = f"You have strong skills in {strength}. Consider highlighting this in your resume and interviews."
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='strengths',
-                    title=title,
-                    content=content,
-                    priority='low'
-                )
+            for strength in analysis_data['strengths']:
+                suggestions.append({
+                    'suggestion_type': 'strengths',
+                    'title': f"Strength: {strength}",
+                    'content': f"You have strong skills in {strength}. Consider highlighting this in your resume and interviews.",
+                    'priority': 'low'
+                })
         
         # Create recommendation suggestions
         if 'recommendations' in analysis_data and analysis_data['recommendations']:
             for i, recommendation in enumerate(analysis_data['recommendations']):
-                title = f"Career Recommendation {i+1}"
-                content = recommendation
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='recommendations',
-                    title=title,
-                    content=content,
-                    priority='medium'
-                )
+                suggestions.append({
+                    'suggestion_type': 'recommendations',
+                    'title': f"Career Recommendation {i+1}",
+                    'content': recommendation,
+                    'priority': 'medium'
+                })
         
         # Create general suggestions
         if 'suggestions' in analysis_data and analysis_data['suggestions']:
             for i, suggestion in enumerate(analysis_data['suggestions']):
-                title = f"Learning Suggestion {i+1}"
-                content = suggestion
-                
-                AISuggestionModel.create_suggestion(
-                    user_id=user_id,
-                    resume_id=resume_id,
-                    job_description_id=job_description_id,
-                    suggestion_type='suggestions',
-                    title=title,
-                    content=content,
-                    priority='low'
-                )
+                suggestions.append({
+                    'suggestion_type': 'suggestions',
+                    'title': f"Learning Suggestion {i+1}",
+                    'content': suggestion,
+                    'priority': 'low'
+                })
         
         # Create summary suggestion
         if 'summary' in analysis_data and analysis_data['summary']:
-            AISuggestionModel.create_suggestion(
-                user_id=user_id,
-                resume_id=resume_id,
-                job_description_id=job_description_id,
-                suggestion_type='summary',
-                title='Analysis Summary',
-                content=analysis_data['summary'],
-                priority='high'
-            )
+            suggestions.append({
+                'suggestion_type': 'summary',
+                'title': 'Analysis Summary',
+                'content': analysis_data['summary'],
+                'priority': 'high'
+            })
         
         # Create conclusion suggestion
         if 'conclusion' in analysis_data and analysis_data['conclusion']:
-            AISuggestionModel.create_suggestion(
-                user_id=user_id,
-                resume_id=resume_id,
-                job_description_id=job_description_id,
-                suggestion_type='conclusion',
-                title='Career Conclusion',
-                content=analysis_data['conclusion'],
-                priority='medium'
-            )
+            suggestions.append({
+                'suggestion_type': 'conclusion',
+                'title': 'Career Conclusion',
+                'content': analysis_data['conclusion'],
+                'priority': 'medium'
+            })
+        
+        # Each analysis run replaces the previous run's suggestions for this resume/job pair
+        suggestion_ids = AISuggestionModel.create_suggestions_bulk(
+            user_id=user_id,
+            suggestions=suggestions,
+            resume_id=resume_id,
+            job_description_id=job_description_id,
+            analysis_run_id=uuid.uuid4().hex
+        )
+        if suggestion_ids is None:
+            raise Exception("Bulk insert of AI suggestions failed")
+        return suggestion_ids
             
     except Exception as e:
         logger.error(f"Error creating suggestions from analysis: {e}")
         raise e
 
-from ai_modules.agents.career_gap_agent import run_gap_analysis
+from ai_modules.agents.career_gap_agent import run_gap_analysis, CareerGapAgent
 
 logger = logging.getLogger(__name__)
 
 # Create Blueprint for API routes
 api_bp = Blueprint('api', __name__)
 
+# Page size for GET /ai-suggestions
+SUGGESTIONS_PAGE_SIZE = 50
+SUGGESTIONS_MAX_PAGE_SIZE = 200
+
 #  Health check
 @api_bp.route('/health', methods=['GET'])
 def api_health():
@@ -276,7 +175,7 @@ def register_user():
             }), 409
         
         # Create session
-        session_token = UserModel.create_session(user['id'])
+        session_token = UserModel.create_session(user['id'], user)
         if not session_token:
             return jsonify({
                 'status': 'error',
@@ -295,6 +194,11 @@ def register_user():
             'sessionToken': session_token
         }), 201
         
+    except HasherBusyError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Server is busy, please try again shortly'
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
         logger.error(f"User registration error: {e}")
         return jsonify({
@@ -336,7 +240,7 @@ def login_user():
             }), 401
         
         # Create session
-        session_token = UserModel.create_session(user['id'])
+        session_token = UserModel.create_session(user['id'], user)
         if not session_token:
             return jsonify({
                 'status': 'error',
@@ -355,6 +259,11 @@ def login_user():
             'sessionToken': session_token
         }), 200
         
+    except HasherBusyError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Server is busy, please try again shortly'
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
         logger.error(f"User login error: {e}")
         return jsonify({
@@ -370,15 +279,13 @@ def logout_user():
     """
     try:
         # Get session token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+        session_token = get_bearer_token()
+        if not session_token:
             return jsonify({
                 'status': 'error',
                 'message': 'Authorization token required'
             }), 401
         
-        session_token = auth_header.split(' ')[1]
-        
         # Delete session
         success = UserModel.delete_session(session_token)
         if not success:
@@ -401,28 +308,13 @@ def logout_user():
 
 #   Get Current User
 @api_bp.route('/auth/me', methods=['GET'])
+@require_user
 def get_current_user():
     """
     Get current user information from session
     """
     try:
-        # Get session token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        
-        # Validate session and get user
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         return jsonify({
             'status': 'success',
@@ -441,29 +333,29 @@ def get_current_user():
             'message': f'Failed to get user information: {str(e)}'
         }), 500
 
+#   Resume upload limits
+@api_bp.route('/resume/limits', methods=['GET'])
+def get_resume_upload_limits():
+    """Upload limits enforced by /resume/upload, so clients can check files before sending them"""
+    return jsonify({
+        'status': 'success',
+        'limits': {
+            'max_bytes': PDF_MAX_BYTES,
+            'max_pages': PDF_MAX_PAGES,
+            'allowed_types': ['application/pdf']
+        }
+    })
+
 #   Resume upload and parsing endpoint
 @api_bp.route('/resume/upload', methods=['POST'])
+@require_user
 def upload_and_parse_resume():
     """
     Upload resume file and parse it using Groq/Llama
     Returns structured JSON with Skills, Education, Work Experience, Projects
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Check if file is present in request
         if 'resume' not in request.files:
@@ -490,9 +382,25 @@ def upload_and_parse_resume():
                 'message': 'Only PDF files are supported. Please upload a PDF file.'
             }), 400
         
-        # Extract text from PDF
-        file_content = file.read()
-        extracted_text = extract_text_from_pdf(file_content)
+        # Don't hold the request's database connection while extracting or waiting on the LLM
+        db_config.release_request_connection()
+        
+        # Spool the upload in bounded chunks, then extract and parse using
+        # Groq/Llama unless this exact file was parsed before
+        try:
+            pdf_file, content_hash = spool_pdf_upload(file.stream)
+            with pdf_file:
+                extracted_text, parsed_data, cached = parse_resume_pdf(pdf_file, content_hash)
+        except InvalidPDFError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        except PDFLimitError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 413
         
         if not extracted_text:
             return jsonify({
@@ -500,9 +408,6 @@ def upload_and_parse_resume():
                 'message': 'Failed to extract text from the uploaded file'
             }), 400
         
-        # Parse resume using Groq/Llama
-        parsed_data = parse_resume(extracted_text)
-        
         # Store resume in database
         resume = ResumeModel.create_resume(
             user_id=user['id'],
@@ -524,11 +429,15 @@ def upload_and_parse_resume():
             'resumeId': resume['id'],
             'filename': file.filename,
             'extracted_text_length': len(extracted_text),
+            'cached': cached,
             'parsed_data': parsed_data
         }
         
         return jsonify(response_data)
         
+    except RequestEntityTooLarge:
+        # Raised on the first read of request.files; let the app's 413 handler answer
+        raise
     except Exception as e:
         logger.error(f"Resume upload/parse error: {e}")
         return jsonify({
@@ -539,27 +448,14 @@ def upload_and_parse_resume():
 
 #   Job description parsing endpoint
 @api_bp.route('/job-description/parse', methods=['POST'])
+@require_user
 def parse_job_description_text():
     """
     Parse job description text using Groq/Llama
     Returns structured JSON with Technical Skills and Technical Synopsis
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Check if JSON data is present in request
         if not request.is_json:
@@ -581,6 +477,9 @@ def parse_job_description_text():
         title = data.get('title', '')
         company = data.get('company', '')
         
+        # Don't hold the request's database connection while waiting on the LLM
+        db_config.release_request_connection()
+        
         # Parse job description using Groq/Llama
         parsed_data = parse_job_description(job_description_text)
         
@@ -619,26 +518,13 @@ def parse_job_description_text():
 
 #   Get user's resumes
 @api_bp.route('/resumes', methods=['GET'])
+@require_user
 def get_user_resumes():
     """
     Get all resumes for the authenticated user
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get user's resumes
         resumes = ResumeModel.get_resumes_by_user(user['id'])
@@ -657,26 +543,13 @@ def get_user_resumes():
 
 #   Get user's job descriptions
 @api_bp.route('/job-descriptions', methods=['GET'])
+@require_user
 def get_user_job_descriptions():
     """
     Get all job descriptions for the authenticated user
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get user's job descriptions
         job_descriptions = JobDescriptionModel.get_job_descriptions_by_user(user['id'])
@@ -695,46 +568,57 @@ def get_user_job_descriptions():
 
 #   Get AI suggestions
 @api_bp.route('/ai-suggestions', methods=['GET'])
+@require_user
 def get_ai_suggestions():
     """
     Get AI suggestions for the authenticated user
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get query parameters
         suggestion_type = request.args.get('type')
         is_read = request.args.get('isRead')
         if is_read is not None:
             is_read = is_read.lower() == 'true'
+        include_content = request.args.get('includeContent', 'true').lower() == 'true'
+        include_superseded = request.args.get('includeSuperseded', 'false').lower() == 'true'
+        cursor = request.args.get('cursor')
         
-        # Get user's AI suggestions
-        suggestions = AISuggestionModel.get_suggestions_by_user(
-            user_id=user['id'],
-            suggestion_type=suggestion_type,
-            is_read=is_read
-        )
+        try:
+            limit = min(int(request.args.get('limit', SUGGESTIONS_PAGE_SIZE)), SUGGESTIONS_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({
+                'status': 'error',
+                'message': 'limit must be a positive integer'
+            }), 400
         
-        # Get suggestion stats
-        stats = AISuggestionModel.get_suggestion_stats(user['id'])
+        # Get one page of the user's AI suggestions
+        try:
+            page = AISuggestionModel.get_suggestions_page(
+                user_id=user['id'],
+                suggestion_type=suggestion_type,
+                is_read=is_read,
+                limit=limit,
+                cursor=cursor,
+                include_content=include_content,
+                include_superseded=include_superseded
+            )
+        except ValueError:
+            return jsonify({
+                'status': 'error',
+                'message': 'Invalid cursor'
+            }), 400
+        
+        # Stats only on the first page; they don't change while paging
+        stats = AISuggestionModel.get_suggestion_stats(user['id']) if not cursor else None
         
         return jsonify({
             'status': 'success',
-            'suggestions': suggestions,
+            'suggestions': page['suggestions'],
+            'next_cursor': page['next_cursor'],
             'stats': stats
         }), 200
         
@@ -747,26 +631,13 @@ def get_ai_suggestions():
 
 #   Create AI suggestion
 @api_bp.route('/ai-suggestions', methods=['POST'])
+@require_user
 def create_ai_suggestion():
     """
     Create a new AI suggestion
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Check if JSON data is present in request
         if not request.is_json:
@@ -818,26 +689,13 @@ def create_ai_suggestion():
 
 #   Mark AI suggestion as read
 @api_bp.route('/ai-suggestions/<int:suggestion_id>/read', methods=['PUT'])
+@require_user
 def mark_suggestion_as_read(suggestion_id):
     """
     Mark an AI suggestion as read
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Mark suggestion as read
         success = AISuggestionModel.mark_suggestion_as_read(suggestion_id, user['id'])
@@ -860,108 +718,141 @@ def mark_suggestion_as_read(suggestion_id):
             'message': f'Failed to mark suggestion as read: {str(e)}'
         }), 500
 
-#   Generate Analysis - Create workplace with latest resume and job description
-@api_bp.route('/analysis/generate', methods=['POST'])
-def generate_analysis():
+#   Shared steps of the analysis endpoints
+def prepare_analysis(user: dict, data: dict):
     """
-    Generate analysis by creating a workplace with latest resume and job description
+    Create or update the workplace for the user's latest resume and job description.
+    Returns (context, None) on success or (None, error response tuple)
     """
-    try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
-        
-        # Get request data
-        data = request.get_json() if request.is_json else {}
-        workplace_name = data.get('name')
-        workplace_description = data.get('description')
-        
-        # Get latest resume and job description for the user
-        latest_data = WorkplaceModel.get_latest_resume_and_job_description(user['id'])
+    # Get latest resume and job description for the user
+    latest_data = WorkplaceModel.get_latest_resume_and_job_description(user['id'])
+    
+    if not latest_data['resume']:
+        return None, (jsonify({
+            'status': 'error',
+            'message': 'No resume found. Please upload a resume first.'
+        }), 400)
+    
+    if not latest_data['job_description']:
+        return None, (jsonify({
+            'status': 'error',
+            'message': 'No job description found. Please add a job description first.'
+        }), 400)
+    
+    # Check if we should update an existing workplace or create a new one
+    workplace = None
+    workplace_id = data.get('workplace_id')
+    
+    if workplace_id:
+        # Update existing workplace
+        workplace = WorkplaceModel.update_workplace(
+            workplace_id,
+            resume_id=latest_data['resume']['id'],
+            job_description_id=latest_data['job_description']['id']
+        )
         
-        if not latest_data['resume']:
-            return jsonify({
+        if not workplace:
+            return None, (jsonify({
                 'status': 'error',
-                'message': 'No resume found. Please upload a resume first.'
-            }), 400
+                'message': 'Failed to update workspace'
+            }), 500)
+    else:
+        # Create new workplace with the latest resume and job description
+        workplace = WorkplaceModel.create_workplace(
+            user_id=user['id'],
+            resume_id=latest_data['resume']['id'],
+            job_description_id=latest_data['job_description']['id'],
+            name=data.get('name'),
+            description=data.get('description')
+        )
         
-        if not latest_data['job_description']:
-            return jsonify({
+        if not workplace:
+            return None, (jsonify({
                 'status': 'error',
-                'message': 'No job description found. Please add a job description first.'
-            }), 400
-        
-        # Check if we should update an existing workplace or create a new one
-        workplace = None
-        workplace_id = data.get('workplace_id')
-        
-        if workplace_id:
-            # Update existing workplace
-            workplace = WorkplaceModel.update_workplace(
-                workplace_id,
-                resume_id=latest_data['resume']['id'],
-                job_description_id=latest_data['job_description']['id']
-            )
-            
-            if not workplace:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'Failed to update workspace'
-                }), 500
-        else:
-            # Create new workplace with the latest resume and job description
-            workplace = WorkplaceModel.create_workplace(
-                user_id=user['id'],
-                resume_id=latest_data['resume']['id'],
-                job_description_id=latest_data['job_description']['id'],
-                name=workplace_name,
-                description=workplace_description
-            )
-            
-            if not workplace:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'Failed to create analysis session'
-                }), 500
+                'message': 'Failed to create analysis session'
+            }), 500)
+    
+    # Prepare resume and job data for gap analysis
+    try:
+        resume_parsed_data = json.loads(latest_data['resume']['parsed_data']) if latest_data['resume']['parsed_data'] else {}
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse resume data: {e}")
+        resume_parsed_data = {'error': 'Failed to parse resume data'}
         
-        # Prepare resume and job data for gap analysis
-        try:
-            resume_parsed_data = json.loads(latest_data['resume']['parsed_data']) if latest_data['resume']['parsed_data'] else {}
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse resume data: {e}")
-            resume_parsed_data = {'error': 'Failed to parse resume data'}
-            
-        try:
-            job_parsed_data = json.loads(latest_data['job_description']['parsed_data']) if latest_data['job_description']['parsed_data'] else {}
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse job description data: {e}")
-            job_parsed_data = {'error': 'Failed to parse job description data'}
+    try:
+        job_parsed_data = json.loads(latest_data['job_description']['parsed_data']) if latest_data['job_description']['parsed_data'] else {}
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse job description data: {e}")
+        job_parsed_data = {'error': 'Failed to parse job description data'}
+    
+    return {
+        'workplace': workplace,
+        'resume_id': latest_data['resume']['id'],
+        'job_description_id': latest_data['job_description']['id'],
+        'resume_parsed_data': resume_parsed_data,
+        'job_parsed_data': job_parsed_data,
+        'resume_data': {
+            'id': latest_data['resume']['id'],
+            'filename': latest_data['resume']['filename'],
+            'parsed_data': resume_parsed_data
+        },
+        'job_description_data': {
+            'id': latest_data['job_description']['id'],
+            'title': latest_data['job_description']['title'],
+            'company': latest_data['job_description']['company'],
+            'parsed_data': job_parsed_data
+        }
+    }, None
+
+def save_analysis_results(user_id: int, workplace_id: int, resume_id: int, job_description_id: int,
+                          gap_analysis_result: dict):
+    """Store a successful gap analysis on the workplace and turn it into AI suggestions"""
+    # Update workplace with analysis data if available
+    if not gap_analysis_result or gap_analysis_result.get('status') != 'success':
+        return
+    
+    WorkplaceModel.update_workplace_analysis(workplace_id, {
+        'gap_analysis': gap_analysis_result['analysis'],
+        'analysis_timestamp': datetime.now().isoformat()
+    })
+    
+    # Create AI suggestions from the analysis data
+    try:
+        create_suggestions_from_analysis(
+            user_id=user_id,
+            analysis_data=gap_analysis_result['analysis'],
+            resume_id=resume_id,
+            job_description_id=job_description_id
+        )
+        logger.info(f"Created AI suggestions for user {user_id}")
+    except Exception as suggestion_error:
+        logger.error(f"Failed to create AI suggestions: {suggestion_error}")
+        # Don't fail the entire analysis if suggestions fail
+
+#   Background analysis job
+def run_analysis_job(job_id: str, user_id: int, workplace_id: int, resume_id: int, job_description_id: int,
+                     resume_parsed_data: dict, job_parsed_data: dict):
+    """
+    Background part of /analysis/generate: gap analysis, workplace update and suggestions
+    """
+    # Refresh the job row while it runs so polling doesn't take it for a lost job
+    stop_heartbeat = start_heartbeat(lambda: JobModel.touch_job(job_id))
+    try:
+        JobModel.update_job(job_id, status='running', progress=10, stage='Running gap analysis')
         
         # Run gap analysis using the agent
         gap_analysis_result = None
         try:
-            logger.info(f"Starting gap analysis for user {user['id']}")
+            logger.info(f"Starting gap analysis for user {user_id}")
             logger.info(f"Resume data keys: {list(resume_parsed_data.keys()) if isinstance(resume_parsed_data, dict) else 'Not a dict'}")
             logger.info(f"Job data keys: {list(job_parsed_data.keys()) if isinstance(job_parsed_data, dict) else 'Not a dict'}")
             
             gap_analysis_result = run_gap_analysis(
                 resume_data=resume_parsed_data,
                 job_data=job_parsed_data,
-                user_id=user['id']
+                user_id=user_id
             )
-            logger.info(f"Gap analysis completed for user {user['id']}")
+            logger.info(f"Gap analysis completed for user {user_id}")
         except Exception as gap_error:
             logger.error(f"Gap analysis failed: {gap_error}")
             logger.error(f"Gap analysis error type: {type(gap_error)}")
@@ -969,46 +860,78 @@ def generate_analysis():
             logger.error(f"Gap analysis traceback: {traceback.format_exc()}")
             # Continue without gap analysis if it fails
         
-        # Update workplace with analysis data if available
-        if gap_analysis_result and gap_analysis_result.get('status') == 'success':
-            WorkplaceModel.update_workplace_analysis(workplace['id'], {
-                'gap_analysis': gap_analysis_result['analysis'],
-                'analysis_timestamp': datetime.now().isoformat()
+        JobModel.update_job(job_id, progress=70, stage='Saving analysis')
+        save_analysis_results(user_id, workplace_id, resume_id, job_description_id, gap_analysis_result)
+        
+        JobModel.update_job(job_id, status='succeeded', progress=100, stage='Completed',
+                            result={'gap_analysis': gap_analysis_result})
+        
+    except Exception as e:
+        logger.error(f"Analysis job {job_id} error: {e}")
+        JobModel.update_job(job_id, status='failed', stage='Failed', error=str(e))
+    finally:
+        stop_heartbeat()
+
+#   Generate Analysis - Create workplace with latest resume and job description
+@api_bp.route('/analysis/generate', methods=['POST'])
+@require_user
+def generate_analysis():
+    """
+    Generate analysis by creating a workplace with latest resume and job description
+    """
+    try:
+        user = g.user
+        
+        # Get request data
+        data = request.get_json() if request.is_json else {}
+        
+        context, error_response = prepare_analysis(user, data)
+        if error_response:
+            return error_response
+        
+        # Hand the slow part (LLM gap analysis and suggestion inserts) to the background queue
+        job_id = uuid.uuid4().hex
+        if not JobModel.create_job(job_id, user['id'], 'gap_analysis', stage='Queued'):
+            return jsonify({
+                'status': 'error',
+                'message': 'Failed to queue analysis'
+            }), 500
+        
+        # Hand the connection back before the worker thread starts using the job row
+        db_config.release_request_connection()
+        
+        try:
+            job_queue.submit(
+                run_analysis_job,
+                job_id=job_id,
+                user_id=user['id'],
+                workplace_id=context['workplace']['id'],
+                resume_id=context['resume_id'],
+                job_description_id=context['job_description_id'],
+                resume_parsed_data=context['resume_parsed_data'],
+                job_parsed_data=context['job_parsed_data']
+            )
+        except JobQueueFullError:
+            JobModel.update_job(job_id, status='failed', error='Analysis queue is full')
+            response = jsonify({
+                'status': 'error',
+                'message': 'Too many analyses in progress, please try again shortly'
             })
-            
-            # Create AI suggestions from the analysis data
-            try:
-                create_suggestions_from_analysis(
-                    user_id=user['id'],
-                    analysis_data=gap_analysis_result['analysis'],
-                    resume_id=latest_data['resume']['id'],
-                    job_description_id=latest_data['job_description']['id']
-                )
-                logger.info(f"Created AI suggestions for user {user['id']}")
-            except Exception as suggestion_error:
-                logger.error(f"Failed to create AI suggestions: {suggestion_error}")
-                # Don't fail the entire request if suggestions fail
-        
-        # Return workplace data with resume and job description info
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        # Return workplace data with resume and job description info; poll the job for the analysis
         response_data = {
             'status': 'success',
-            'message': 'Analysis session created successfully',
-            'workplace': workplace,
-            'resume_data': {
-                'id': latest_data['resume']['id'],
-                'filename': latest_data['resume']['filename'],
-                'parsed_data': resume_parsed_data
-            },
-            'job_description_data': {
-                'id': latest_data['job_description']['id'],
-                'title': latest_data['job_description']['title'],
-                'company': latest_data['job_description']['company'],
-                'parsed_data': job_parsed_data
-            },
-            'gap_analysis': gap_analysis_result
+            'message': 'Analysis queued',
+            'job_id': job_id,
+            'status_url': f"/api/jobs/{job_id}",
+            'workplace': context['workplace'],
+            'resume_data': context['resume_data'],
+            'job_description_data': context['job_description_data']
         }
         
-        return jsonify(response_data), 201
+        return jsonify(response_data), 202
         
     except Exception as e:
         logger.error(f"Generate analysis error: {e}")
@@ -1017,31 +940,109 @@ def generate_analysis():
             'message': f'Failed to generate analysis: {str(e)}'
         }), 500
 
+#   Stream an analysis as Server-Sent Events
+@api_bp.route('/analysis/stream', methods=['POST'])
+@require_user
+def stream_analysis():
+    """
+    Same as /analysis/generate but runs inline and streams the result as SSE:
+    start, delta (raw tokens), item (each skillsToImprove entry), done, error
+    """
+    try:
+        user = g.user
+        
+        data = request.get_json() if request.is_json else {}
+        
+        context, error_response = prepare_analysis(user, data)
+        if error_response:
+            return error_response
+        
+        def events():
+            try:
+                # Don't hold the request's database connection while streaming from the LLM
+                db_config.release_request_connection()
+                
+                yield format_sse('start', {
+                    'workplace': context['workplace'],
+                    'resume_data': context['resume_data'],
+                    'job_description_data': context['job_description_data']
+                })
+                
+                agent = CareerGapAgent(user_id=user['id'])
+                gap_analysis_result = None
+                index = 0
+                for kind, payload in agent.stream_gap_analysis(context['resume_parsed_data'], context['job_parsed_data']):
+                    if kind == 'delta':
+                        yield format_sse('delta', {'text': payload})
+                    elif kind == 'item':
+                        yield format_sse('item', {'key': 'skillsToImprove', 'index': index, 'item': payload})
+                        index += 1
+                    else:
+                        gap_analysis_result = payload
+                
+                save_analysis_results(user['id'], context['workplace']['id'], context['resume_id'],
+                                      context['job_description_id'], gap_analysis_result)
+                
+                yield format_sse('done', {
+                    'workplace': context['workplace'],
+                    'gap_analysis': gap_analysis_result
+                })
+            except Exception as e:
+                logger.error(f"Stream analysis error: {e}")
+                yield format_sse('error', {'message': f'Failed to generate analysis: {str(e)}'})
+        
+        return sse_response(events())
+        
+    except Exception as e:
+        logger.error(f"Stream analysis error: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Failed to generate analysis: {str(e)}'
+        }), 500
+
+#   Background job status
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+@require_user
+def get_job_status(job_id):
+    """
+    Get status, progress and (once finished) the result of a background job
+    """
+    try:
+        user = g.user
+        
+        job = JobModel.get_job(job_id, user['id'])
+        
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'message': 'Job not found'
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'job': job
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Get job status error: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Internal server error'
+        }), 500
+
 #   Get user's workplaces
 @api_bp.route('/workplaces', methods=['GET'])
+@require_user
 def get_user_workplaces():
     """
     Get all workplaces (analysis sessions) for the authenticated user
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
+        user = g.user
         
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
-        
-        # Get user's workplaces
-        workplaces = WorkplaceModel.get_workplaces_by_user(user['id'])
+        # Listings are summaries; ?include=analysis adds the decoded analysis_data
+        include = request.args.get('include', '').split(',')
+        workplaces = WorkplaceModel.get_workplaces_by_user(user['id'], include_analysis='analysis' in include)
         
         return jsonify({
             'status': 'success',
@@ -1057,26 +1058,13 @@ def get_user_workplaces():
 
 #   Create a new workplace
 @api_bp.route('/workplaces', methods=['POST'])
+@require_user
 def create_workplace():
     """
     Create a new workplace (workspace) for the authenticated user
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get request data
         data = request.get_json()
@@ -1117,26 +1105,13 @@ def create_workplace():
 
 #   Update workplace with resume and job description
 @api_bp.route('/workplaces/<int:workplace_id>', methods=['PUT'])
+@require_user
 def update_workplace(workplace_id):
     """
     Update an existing workplace with resume and job description data
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get request data
         data = request.get_json()
@@ -1188,26 +1163,13 @@ def update_workplace(workplace_id):
 
 #   Get specific workplace with full data
 @api_bp.route('/workplaces/<int:workplace_id>', methods=['GET'])
+@require_user
 def get_workplace(workplace_id):
     """
     Get a specific workplace with full resume and job description data
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get workplace with full data
         workplace = WorkplaceModel.get_workplace_by_id(workplace_id)
@@ -1238,26 +1200,13 @@ def get_workplace(workplace_id):
         }), 500
 
 @api_bp.route('/workplaces/<int:workplace_id>', methods=['DELETE'])
+@require_user
 def delete_workplace(workplace_id):
     """
     Delete a workplace and all associated data
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get workplace to verify ownership
         workplace = WorkplaceModel.get_workplace_by_id(workplace_id)
@@ -1297,22 +1246,10 @@ def delete_workplace(workplace_id):
         }), 500
 
 @api_bp.route("/ai/skill-gap", methods=["POST"])
+@require_user
 def skill_gap_analysis():
     data = request.json
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({
-            'status': 'error',
-            'message': 'Authorization token required'
-        }), 401
-        
-    session_token = auth_header.split(' ')[1]
-    user = UserModel.validate_session(session_token)
-    if not user:
-        return jsonify({
-            'status': 'error',
-            'message': 'Invalid or expired session'
-        }), 401
+    user = g.user
 
     resume = data.get("resume")
     job = data.get("job")
@@ -1321,6 +1258,7 @@ def skill_gap_analysis():
         return jsonify({"error": "Missing resume or job data"}), 400
 
     try:
+        db_config.release_request_connection()
         result = run_gap_analysis(resume, job, user['id'])
         print(result)
         
@@ -1329,25 +1267,13 @@ def skill_gap_analysis():
         return jsonify({"error": str(e)}), 500
 
 @api_bp.route('/create-roadmap', methods=['POST'])
+@require_user
 def create_roadmap():
     try:
         # Get input data from request
         data = request.get_json()
 
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-            
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         duration = data.get('duration', 14)
         
@@ -1389,29 +1315,54 @@ def create_roadmap():
             'error': str(e)
         }), 500
 
+@api_bp.route('/create-roadmap/stream', methods=['POST'])
+@require_user
+def stream_roadmap():
+    """
+    Stream roadmap generation as SSE: delta (raw tokens), item (each plan day), done, error
+    """
+    try:
+        data = request.get_json() if request.is_json else {}
+        
+        user = g.user
+        
+        duration = data.get('duration', 14)
+        
+        def events():
+            try:
+                index = 0
+                for kind, payload in stream_study_plan(duration, user['id']):
+                    if kind == 'delta':
+                        yield format_sse('delta', {'text': payload})
+                    elif kind == 'item':
+                        yield format_sse('item', {'key': 'plan', 'index': index, 'item': payload})
+                        index += 1
+                    else:
+                        yield format_sse('done', {'data': payload})
+            except Exception as e:
+                logger.error(f"Stream roadmap error: {e}")
+                yield format_sse('error', {'message': f'Failed to create roadmap: {str(e)}'})
+        
+        return sse_response(events())
+        
+    except Exception as e:
+        logger.error(f"Error streaming roadmap: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to create roadmap',
+            'error': str(e)
+        }), 500
+
 # Goals API endpoints
 
 @api_bp.route('/goals', methods=['POST'])
+@require_user
 def create_goal():
     """
     Create or update a goal for a workplace
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Check if JSON data is present in request
         if not request.is_json:
@@ -1459,26 +1410,13 @@ def create_goal():
         }), 500
 
 @api_bp.route('/goals/workplace/<int:workplace_id>', methods=['GET'])
+@require_user
 def get_goal_by_workplace(workplace_id):
     """
     Get the active goal for a specific workplace
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get goal for workplace
         goal = GoalsModel.get_goal_by_workplace(user['id'], workplace_id)
@@ -1503,26 +1441,13 @@ def get_goal_by_workplace(workplace_id):
         }), 500
 
 @api_bp.route('/goals', methods=['GET'])
+@require_user
 def get_user_goals():
     """
     Get all goals for the authenticated user
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get all goals for user
         goals = GoalsModel.get_goals_by_user(user['id'])
@@ -1540,26 +1465,13 @@ def get_user_goals():
         }), 500
 
 @api_bp.route('/goals/<int:goal_id>', methods=['DELETE'])
+@require_user
 def delete_goal(goal_id):
     """
     Delete a goal
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Delete goal
         success = GoalsModel.delete_goal(goal_id, user['id'])
@@ -1585,26 +1497,13 @@ def delete_goal(goal_id):
 # Task completion API endpoints
 
 @api_bp.route('/task-completions', methods=['POST'])
+@require_user
 def mark_task_completion():
     """
     Mark a task as completed or uncompleted
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Check if JSON data is present in request
         if not request.is_json:
@@ -1652,26 +1551,13 @@ def mark_task_completion():
         }), 500
 
 @api_bp.route('/task-completions/workplace/<int:workplace_id>', methods=['GET'])
+@require_user
 def get_task_completions(workplace_id):
     """
     Get task completion status for a workplace
     """
     try:
-        # Check authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'status': 'error',
-                'message': 'Authorization token required'
-            }), 401
-        
-        session_token = auth_header.split(' ')[1]
-        user = UserModel.validate_session(session_token)
-        if not user:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid or expired session'
-            }), 401
+        user = g.user
         
         # Get query parameters for date range
         start_date = request.args.get('start_date')
@@ -0,0 +1,73 @@
+"""
+Authentication helpers for API routes
+Resolves the session user once per request and records how long it took
+"""
+
+import time
+from functools import wraps
+from typing import Optional
+
+from flask import after_this_request, g, jsonify, request
+
+from models.user_model import UserModel
+from utils.metrics import LatencyStats, register_metrics
+
+auth_latency = LatencyStats()
+register_metrics('auth', auth_latency.snapshot)
+
+
+def get_bearer_token() -> Optional[str]:
+    """Return the session token from the Authorization header, if any"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return auth_header.split(' ')[1]
+
+
+def resolve_user():
+    """
+    Validate the request's session token and store the user on ``g``.
+
+    The lookup runs at most once per request; later calls reuse ``g.user``.
+    """
+    if 'user' in g:
+        return g.user
+
+    started = time.perf_counter()
+    session_token = get_bearer_token()
+    user = UserModel.validate_session(session_token) if session_token else None
+    g.auth_ms = (time.perf_counter() - started) * 1000
+    auth_latency.observe(g.auth_ms)
+
+    g.session_token = session_token
+    g.user = user
+    return user
+
+
+def require_user(view):
+    """Reject the request with 401 unless it carries a valid session token"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user = resolve_user()
+
+        auth_ms = g.auth_ms
+
+        @after_this_request
+        def add_server_timing(response):
+            response.headers.add('Server-Timing', f'auth;dur={auth_ms:.1f}')
+            return response
+
+        if not g.session_token:
+            return jsonify({
+                'status': 'error',
+                'message': 'Authorization token required'
+            }), 401
+
+        if not user:
+            return jsonify({
+                'status': 'error',
+                'message': 'Invalid or expired session'
+            }), 401
+
+        return view(*args, **kwargs)
+    return wrapper
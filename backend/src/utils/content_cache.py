@@ -0,0 +1,185 @@
+"""
+Content-addressed cache
+In-memory LRU backed by an optional on-disk tier, keyed by a hash of the inputs
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.ttl_cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+
+class ContentCache:
+    """
+    Cache for expensive, deterministic results such as LLM parses.
+
+    Values must be JSON-serialisable. Each entry may carry a ``cost`` in
+    bytes (prompt plus response size) that is added to ``bytes_saved``
+    whenever the entry is served instead of being recomputed.
+
+    With ``max_disk_bytes`` set, the disk tier is trimmed back below the
+    limit after a write pushes it over, removing the least recently used
+    entries first (disk hits refresh an entry's mtime).
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 512, directory: Optional[str] = None,
+                 max_disk_bytes: Optional[int] = None):
+        self.namespace = namespace
+        self._memory = TTLCache(maxsize=maxsize, ttl=None)
+        self.directory = os.path.join(directory, namespace) if directory else None
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # Estimated size of the disk tier; scanned on the first write and
+        # rescanned whenever it is trimmed, since other processes share it
+        self._disk_bytes = None
+        self.disk_evictions = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """SHA-256 over the given parts, separated so they can't run together"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for ``key`` or None"""
+        entry = self._memory.get(key)
+        tier = 'memory'
+        if entry is MISSING and self.directory:
+            entry = self._read_disk(key)
+            tier = 'disk'
+            if entry is not MISSING:
+                self._memory.set(key, entry)
+
+        with self._lock:
+            if entry is MISSING:
+                self.misses += 1
+                return None
+            if tier == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            self.bytes_saved += entry.get('cost', 0)
+        return entry['value']
+
+    def set(self, key: str, value: Any, cost: int = 0) -> None:
+        """Store a value in memory and, if configured, on disk"""
+        entry = {'value': value, 'cost': cost}
+        self._memory.set(key, entry)
+        with self._lock:
+            self.stores += 1
+        if self.directory:
+            self._write_disk(key, entry)
+
+    def _read_disk(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self.max_disk_bytes:
+                os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return MISSING
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {self.namespace} cache entry {key}: {e}")
+            return MISSING
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            if self.max_disk_bytes:
+                self._trim_disk(os.path.getsize(path))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write {self.namespace} cache entry {key}: {e}")
+
+    def _scan_disk(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every entry in the disk tier"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((info.st_mtime, info.st_size, path))
+        return files
+
+    def _trim_disk(self, written: int) -> None:
+        """Account for a write and evict the oldest entries once over max_disk_bytes"""
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+            else:
+                self._disk_bytes += written
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+
+            files = sorted(self._scan_disk())
+            total = sum(size for _, size, _ in files)
+            # Trim to 90% so a full cache isn't rescanned on every write
+            target = self.max_disk_bytes * 0.9
+            evicted = 0
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to evict {self.namespace} cache entry {path}: {e}")
+                    continue
+                total -= size
+                evicted += 1
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+            if evicted:
+                logger.info(f"Evicted {evicted} {self.namespace} cache entries from disk ({total} bytes left)")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            'entries': len(self._memory),
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'disk_tier': bool(self.directory),
+            'disk_bytes': self._disk_bytes,
+            'disk_evictions': self.disk_evictions
+        }
@@ -0,0 +1,42 @@
+"""
+Cooperative (gevent) serving support
+Detects gevent-patched workers and keeps CPU-bound work off the event loop there
+"""
+
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def is_cooperative() -> bool:
+    """True when running in a gevent worker that has monkey-patched the socket module"""
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
+
+def native_thread_pool(max_workers: int, thread_name_prefix: str) -> ThreadPoolExecutor:
+    """
+    Executor for CPU-bound work such as bcrypt.
+
+    Under gevent, ``threading`` is patched and a regular ThreadPoolExecutor
+    would run its jobs as greenlets on the event loop thread, stalling every
+    other request. gevent's executor runs them on real OS threads instead
+    and returns futures that can be waited on cooperatively.
+    """
+    if is_cooperative():
+        from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+        return NativeThreadPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+
+def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """Call ``fn(*args)``; under gevent it runs on the hub's native thread pool so other greenlets keep running"""
+    if is_cooperative():
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args)
+    return fn(*args)
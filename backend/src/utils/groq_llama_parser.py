@@ -1,20 +1,21 @@
-import openai
+import copy
+import hashlib
 import json
 import os
+from typing import BinaryIO
 from dotenv import load_dotenv
 
+from ai_modules.prompt_registry import prompt_registry
+from utils.content_cache import ContentCache
+from utils.llm_client import llm_client
+from utils.metrics import register_metrics
+from utils.pdf_extractor import extract_text_from_pdf
+
 load_dotenv()
 
-# Configure Groq API
-openai.api_key = os.getenv("GROQ_API_KEY", "YOUR_GROQ_API_KEY")
-openai.api_base = "https://api.groq.com/openai/v1"
+PARSER_MODEL = "llama-3.1-8b-instant"
 
-def parse_resume(resume_text: str):
-    """
-    Parse resume text and extract structured information using Groq/Llama
-    Returns: JSON with Skills, Education, Work Experience, and Projects
-    """
-    prompt = f"""
+RESUME_PROMPT_TEMPLATE = """
 Extract structured information from the following resume and return it as a valid JSON object with these exact keys:
 
 1. "skills": Array of technical skills (programming languages, frameworks, tools, etc.)
@@ -35,46 +36,7 @@ Resume Text:
 
 JSON Response:"""
 
-    try:
-        response = openai.ChatCompletion.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=2000
-        )
-        
-        result = response['choices'][0]['message']['content'].strip()
-        
-        # Try to parse as JSON to validate
-        try:
-            parsed_json = json.loads(result)
-            return parsed_json
-        except json.JSONDecodeError:
-            # If JSON parsing fails, return a structured error
-            return {
-                "skills": [],
-                "education": [],
-                "work_experience": [],
-                "projects": [],
-                "error": "Failed to parse resume - invalid JSON response from AI"
-            }
-            
-    except Exception as e:
-        return {
-            "skills": [],
-            "education": [],
-            "work_experience": [],
-            "projects": [],
-            "error": f"API call failed: {str(e)}"
-        }
-
-
-def parse_job_description(job_description_text: str):
-    """
-    Parse job description text and extract structured information using Groq/Llama
-    Returns: JSON with Technical Skills and Technical Synopsis
-    """
-    prompt = f"""
+JOB_DESCRIPTION_PROMPT_TEMPLATE = """
 Extract structured information from the following job description and return it as a valid JSON object with these exact keys:
 
 1. "technical_skills": Array of technical skills required for the job (programming languages, frameworks, tools, technologies, databases, etc.)
@@ -94,31 +56,131 @@ Job Description Text:
 
 JSON Response:"""
 
+# Cached parses are keyed by model, template version and input text, so editing
+# a template or switching model never serves results produced by the old one.
+RESUME_PROMPT = prompt_registry.register("resume_parse", RESUME_PROMPT_TEMPLATE,
+                                         placeholders={"resume_text"})
+JOB_DESCRIPTION_PROMPT = prompt_registry.register("job_description_parse", JOB_DESCRIPTION_PROMPT_TEMPLATE,
+                                                  placeholders={"job_description_text"})
+RESUME_PROMPT_VERSION = RESUME_PROMPT.version
+JOB_DESCRIPTION_PROMPT_VERSION = JOB_DESCRIPTION_PROMPT.version
+
+# Each cache's disk tier is trimmed to this size (0 leaves it unbounded)
+LLM_CACHE_DIR_MAX_BYTES = int(os.getenv('LLM_CACHE_DIR_MAX_BYTES', str(256 * 1024 * 1024)))
+
+llm_cache = ContentCache(
+    namespace='llm',
+    maxsize=int(os.getenv('LLM_CACHE_SIZE', '512')),
+    directory=os.getenv('LLM_CACHE_DIR') or None,
+    max_disk_bytes=LLM_CACHE_DIR_MAX_BYTES
+)
+register_metrics('llm_cache', llm_cache.stats)
+
+# Extracted text and parse of uploaded PDFs, keyed by the file's SHA-256, so a
+# re-uploaded file skips both extraction and the LLM call
+pdf_cache = ContentCache(
+    namespace='pdf',
+    maxsize=int(os.getenv('PDF_CACHE_SIZE', '256')),
+    directory=os.getenv('LLM_CACHE_DIR') or None,
+    max_disk_bytes=LLM_CACHE_DIR_MAX_BYTES
+)
+register_metrics('pdf_cache', pdf_cache.stats)
+
+
+def _cached_parse(prompt_version: str, input_text: str, prompt: str, max_tokens: int,
+                  empty_result: dict, invalid_json_error: str) -> dict:
+    """Run a parse prompt through the content cache; only successful parses are stored"""
+    cache_key = ContentCache.make_key(PARSER_MODEL, prompt_version, input_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
     try:
-        response = openai.ChatCompletion.create(
-            model="llama-3.1-8b-instant",
+        result = llm_client.chat_content(
+            model=PARSER_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
-            max_tokens=1000
-        )
-        
-        result = response['choices'][0]['message']['content'].strip()
+            max_tokens=max_tokens
+        ).strip()
         
         # Try to parse as JSON to validate
         try:
             parsed_json = json.loads(result)
-            return parsed_json
         except json.JSONDecodeError:
             # If JSON parsing fails, return a structured error
-            return {
-                "technical_skills": [],
-                "technical_synopsis": "",
-                "error": "Failed to parse job description - invalid JSON response from AI"
-            }
+            return dict(empty_result, error=invalid_json_error)
+        
+        if isinstance(parsed_json, dict) and 'error' not in parsed_json:
+            cost = len(prompt.encode('utf-8')) + len(result.encode('utf-8'))
+            llm_cache.set(cache_key, parsed_json, cost=cost)
+        return copy.deepcopy(parsed_json)
             
     except Exception as e:
-        return {
+        return dict(empty_result, error=f"API call failed: {str(e)}")
+
+
+def parse_resume(resume_text: str):
+    """
+    Parse resume text and extract structured information using Groq/Llama
+    Returns: JSON with Skills, Education, Work Experience, and Projects
+    """
+    prompt = RESUME_PROMPT.render(resume_text=resume_text)
+    return _cached_parse(
+        RESUME_PROMPT_VERSION, resume_text, prompt, 2000,
+        empty_result={
+            "skills": [],
+            "education": [],
+            "work_experience": [],
+            "projects": []
+        },
+        invalid_json_error="Failed to parse resume - invalid JSON response from AI"
+    )
+
+
+def parse_job_description(job_description_text: str):
+    """
+    Parse job description text and extract structured information using Groq/Llama
+    Returns: JSON with Technical Skills and Technical Synopsis
+    """
+    prompt = JOB_DESCRIPTION_PROMPT.render(job_description_text=job_description_text)
+    return _cached_parse(
+        JOB_DESCRIPTION_PROMPT_VERSION, job_description_text, prompt, 1000,
+        empty_result={
             "technical_skills": [],
-            "technical_synopsis": "",
-            "error": f"API call failed: {str(e)}"
-        }
\ No newline at end of file
+            "technical_synopsis": ""
+        },
+        invalid_json_error="Failed to parse job description - invalid JSON response from AI"
+    )
+
+
+def parse_resume_pdf(pdf_file: BinaryIO, content_hash: str = None):
+    """
+    Extract and parse an uploaded resume PDF, reusing earlier results for byte-identical files
+    ``content_hash`` is the file's SHA-256 if the caller already computed it
+    Returns: (extracted_text, parsed_data, cached); extracted_text is None if extraction failed
+    """
+    file_content = None
+    if content_hash is None:
+        file_content = pdf_file.read()
+        content_hash = hashlib.sha256(file_content).hexdigest()
+
+    cache_key = ContentCache.make_key(PARSER_MODEL, RESUME_PROMPT_VERSION, content_hash)
+    cached = pdf_cache.get(cache_key)
+    if cached is not None:
+        return cached['text'], copy.deepcopy(cached['parsed_data']), True
+
+    # Only read the file into memory once it actually has to be extracted
+    if file_content is None:
+        file_content = pdf_file.read()
+    extracted_text = extract_text_from_pdf(file_content)
+    if not extracted_text:
+        return extracted_text, None, False
+
+    parsed_data = parse_resume(extracted_text)
+    if isinstance(parsed_data, dict) and 'error' not in parsed_data:
+        pdf_cache.set(
+            cache_key,
+            {'text': extracted_text, 'parsed_data': parsed_data},
+            cost=len(file_content)
+        )
+    return extracted_text, copy.deepcopy(parsed_data), False
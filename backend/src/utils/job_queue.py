@@ -0,0 +1,125 @@
+"""
+In-process background job queue
+Runs long jobs on a bounded local thread pool so request workers return immediately
+"""
+
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable
+
+from utils.metrics import LatencyStats, register_metrics
+from utils.rate_limiter import llm_priority, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats of a running job; keep well below JOB_STALE_AFTER
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '60'))
+
+
+class JobQueueFullError(Exception):
+    """Raised when the queue already holds ``max_pending`` jobs"""
+
+
+def start_heartbeat(beat: Callable[[], Any], interval: float = JOB_HEARTBEAT_INTERVAL) -> Callable[[], None]:
+    """Call ``beat`` every ``interval`` seconds on a daemon thread; returns the function that stops it"""
+    stopped = threading.Event()
+
+    def loop():
+        while not stopped.wait(interval):
+            try:
+                beat()
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {e}")
+
+    threading.Thread(target=loop, name='job-heartbeat', daemon=True).start()
+    return stopped.set
+
+
+class JobQueue:
+    """
+    Bounded thread pool for background jobs.
+
+    Jobs are plain callables; they report their own progress (see
+    JobModel). No broker is involved, so jobs queued in a process are lost
+    if that process dies.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait = LatencyStats()
+        self.run_time = LatencyStats()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so forked server workers each get their own threads
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue ``fn(*args, **kwargs)``; raises JobQueueFullError when saturated"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFullError("Background job queue is full")
+            self._pending += 1
+            executor = self._get_executor()
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            self.queue_wait.observe((started - submitted) * 1000)
+            with self._lock:
+                self._running += 1
+            try:
+                # Interactive requests get LLM rate-limit budget before background jobs
+                with llm_priority(BACKGROUND):
+                    result = fn(*args, **kwargs)
+                with self._lock:
+                    self.completed += 1
+                return result
+            except Exception as e:
+                logger.error(f"Background job {getattr(fn, '__name__', fn)} failed: {e}")
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                self.run_time.observe((time.perf_counter() - started) * 1000)
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+
+        return executor.submit(job)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self._pending,
+            'running': self._running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'queue_wait': self.queue_wait.snapshot(),
+            'run_time': self.run_time.snapshot()
+        }
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv('JOB_WORKERS', '4')),
+    max_pending=int(os.getenv('JOB_MAX_PENDING', '50'))
+)
+register_metrics('job_queue', job_queue.stats)
@@ -0,0 +1,93 @@
+"""
+Incremental JSON extraction for streamed LLM output
+Pulls completed elements out of a top-level JSON array while the document is still arriving
+"""
+
+import json
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStreamer:
+    """
+    Feed text chunks of a JSON object; get back each completed object
+    element of the top-level array stored under ``key``.
+
+    Only brace/bracket depth and string state are tracked, so text before
+    the opening ``{`` (e.g. a markdown fence) is skipped harmlessly. Each
+    element is parsed with json.loads once its closing brace arrives;
+    elements that fail to parse are dropped and left for the final parse.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._pending_key = None
+        self._array_depth = None
+        self._element_start = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume ``chunk`` and return the elements completed by it"""
+        completed = []
+        for char in chunk:
+            self._buffer.append(char)
+            index = self._pos
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._element_start is None:
+                        self._last_string = ''.join(self._buffer[self._string_start + 1:index])
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ':':
+                # Keys of the top-level object sit at depth 1
+                self._pending_key = self._last_string if self._depth == 1 else None
+            elif char in '{[':
+                self._depth += 1
+                if char == '[' and self._array_depth is None and self._pending_key == self.key:
+                    self._array_depth = self._depth
+                elif char == '{' and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._element_start = index
+                self._pending_key = None
+            elif char in '}]':
+                if char == '}' and self._element_start is not None and self._depth == self._array_depth + 1:
+                    element = self._parse(''.join(self._buffer[self._element_start:index + 1]))
+                    if element is not None:
+                        completed.append(element)
+                    self._element_start = None
+                elif char == ']' and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+            elif char == ',':
+                self._pending_key = None
+
+        # Only the current element (if any) has to stay buffered
+        if self._element_start is None and not self._in_string:
+            self._buffer = []
+            self._pos = 0
+        return completed
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Any]:
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            logger.warning(f"Skipping unparseable streamed element: {e}")
+            return None
@@ -0,0 +1,328 @@
+"""
+Shared Groq LLM client
+Every chat-completion call in the backend goes through one pooled,
+keep-alive HTTP session so repeated calls reuse TLS connections
+"""
+
+import os
+import json
+import hashlib
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from utils.metrics import register_metrics
+from utils.model_health import model_health
+from utils.rate_limiter import rate_limiter, estimate_tokens, key_id, RateLimitExceededError
+from utils.singleflight import SingleFlight
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    """A chat-completion request failed"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, model: Optional[str] = None,
+                 body: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.model = model
+        self.body = body
+
+
+class LLMTimeoutError(LLMError):
+    """A chat-completion request timed out"""
+
+
+class ModelUnavailableError(LLMError):
+    """The model's circuit breaker is open, so no request was sent"""
+
+
+class RateLimitedError(LLMError):
+    """No rate-limit budget became available in time, so no request was sent"""
+
+
+def _request_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                 api_key: Optional[str], options: Dict[str, Any]) -> str:
+    """Hash of everything that determines a completion, with whitespace runs in the prompt collapsed"""
+    normalized = [
+        {'role': message.get('role'), 'content': ' '.join((message.get('content') or '').split())}
+        for message in messages
+    ]
+    payload = json.dumps(
+        [model, normalized, temperature, max_tokens, options, api_key],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _is_model_not_found(status_code: int, body: str) -> bool:
+    if status_code == 404:
+        return True
+    body = (body or '').lower()
+    return status_code == 400 and ('model_not_found' in body or 'decommissioned' in body)
+
+
+class GroqClient:
+    """Groq chat-completions client backed by a pooled requests.Session"""
+
+    def __init__(self, api_key: Optional[str], base_url: str, pool_connections: int, pool_maxsize: int,
+                 connect_timeout: float, read_timeout: float, hedge_workers: int = 16):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.hedge_workers = hedge_workers
+        self._session = None
+        self._pid = None
+        self._hedge_executor = None
+        self._hedge_pid = None
+        self._hedge_lock = threading.Lock()
+        self.singleflight = SingleFlight()
+
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive session, created lazily once per process"""
+        if self._session is None or self._pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                max_retries=0
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
+
+    def _post_chat(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                   timeout: Optional[float], api_key: Optional[str], stream: bool,
+                   options: Dict[str, Any]) -> Tuple[requests.Response, str, int]:
+        """
+        Send the request once the rate limiter admits it and return the 200
+        response with the key's rate-limit account and the number of tokens
+        reserved for it. Failures are recorded with the model's breaker.
+        """
+        api_key = api_key or self.api_key
+        if not api_key:
+            raise LLMError("GROQ_API_KEY not set", model=model)
+        account = key_id(api_key)
+
+        payload = {
+            "messages": messages,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+        payload.update(options)
+
+        if not model_health.allow(model):
+            raise ModelUnavailableError(f"Model {model} is temporarily disabled by its circuit breaker", model=model)
+
+        try:
+            reserved = rate_limiter.acquire(account, model, estimate_tokens(messages, max_tokens))
+        except RateLimitExceededError as e:
+            model_health.record_inconclusive(model)
+            raise RateLimitedError(str(e), status_code=429, model=model) from e
+
+        try:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=payload,
+                timeout=(self.connect_timeout, timeout or self.read_timeout),
+                stream=stream
+            )
+        except requests.exceptions.Timeout as e:
+            rate_limiter.settle(account, model, reserved, sent=False)
+            model_health.record_failure(model, f"timeout: {e}", 'timeout')
+            raise LLMTimeoutError(f"Model {model} timed out: {e}", model=model) from e
+        except requests.exceptions.RequestException as e:
+            rate_limiter.settle(account, model, reserved, sent=False)
+            model_health.record_failure(model, f"request failed: {e}")
+            raise LLMError(f"Model {model} request failed: {e}", model=model) from e
+
+        rate_limiter.observe_headers(account, model, response.headers, response.status_code)
+        if response.status_code != 200:
+            status = response.status_code
+            body = response.text
+            response.close()
+            # Rejected requests produce no completion, so give the budget back
+            rate_limiter.settle(account, model, reserved, sent=False)
+            if _is_model_not_found(status, body):
+                model_health.record_failure(model, f"HTTP {status}: model not found", 'not_found')
+            elif status == 429 or status >= 500:
+                model_health.record_failure(model, f"HTTP {status}")
+            else:
+                # Other 4xx answers (bad key, bad payload) say nothing about the model's health
+                model_health.record_inconclusive(model)
+            raise LLMError(
+                f"Model {model} failed with status {status}",
+                status_code=status,
+                model=model,
+                body=body
+            )
+        return response, account, reserved
+
+    def chat_completion(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.2,
+                        max_tokens: int = 2000, timeout: Optional[float] = None,
+                        api_key: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        """
+        POST /chat/completions and return the decoded JSON body. Identical
+        requests already in flight (e.g. a double-clicked roadmap) share the
+        same upstream call instead of each sending their own.
+        """
+        key = _request_key(model, messages, temperature, max_tokens, api_key, options)
+        body, _ = self.singleflight.do(
+            key,
+            lambda: self._chat_completion(model, messages, temperature, max_tokens, timeout, api_key, options)
+        )
+        return body
+
+    def _chat_completion(self, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                         timeout: Optional[float], api_key: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        response, account, reserved = self._post_chat(model, messages, temperature, max_tokens, timeout,
+                                                      api_key, False, options)
+        model_health.record_success(model, (time.perf_counter() - started) * 1000)
+        body = response.json()
+        rate_limiter.settle(account, model, reserved, (body.get('usage') or {}).get('total_tokens'))
+        return body
+
+    def stream_chat_content(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.2,
+                            max_tokens: int = 2000, timeout: Optional[float] = None,
+                            api_key: Optional[str] = None, **options: Any) -> Iterator[str]:
+        """
+        POST /chat/completions with ``stream: true`` and yield content deltas
+        as the server-sent chunks arrive. ``timeout`` bounds the gap between
+        chunks rather than the whole completion.
+        """
+        started = time.perf_counter()
+        response, account, reserved = self._post_chat(model, messages, temperature, max_tokens, timeout,
+                                                      api_key, True, options)
+        # Groq doesn't always name a charset for text/event-stream
+        response.encoding = 'utf-8'
+        used_tokens = None
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                # Groq reports usage on the final chunk under x_groq
+                usage = chunk.get('usage') or (chunk.get('x_groq') or {}).get('usage')
+                if usage:
+                    used_tokens = usage.get('total_tokens')
+                choices = chunk.get('choices') or []
+                text = choices[0].get('delta', {}).get('content') if choices else None
+                if text:
+                    yield text
+        except requests.exceptions.Timeout as e:
+            model_health.record_failure(model, f"stream timeout: {e}", 'timeout')
+            raise LLMTimeoutError(f"Model {model} stream timed out: {e}", model=model) from e
+        except requests.exceptions.RequestException as e:
+            model_health.record_failure(model, f"stream failed: {e}")
+            raise LLMError(f"Model {model} stream failed: {e}", model=model) from e
+        except ValueError as e:
+            model_health.record_failure(model, f"malformed stream chunk: {e}")
+            raise LLMError(f"Model {model} sent a malformed stream chunk: {e}", model=model) from e
+        finally:
+            response.close()
+            # Without a usage chunk (or after an error) the reservation stands as the estimate
+            rate_limiter.settle(account, model, reserved, used_tokens)
+        model_health.record_success(model, (time.perf_counter() - started) * 1000)
+
+    def chat_content(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        """Run a chat completion and return the first choice's message content"""
+        return self.chat_completion(model, messages, **kwargs)["choices"][0]["message"]["content"]
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_lock:
+            if self._hedge_executor is None or self._hedge_pid != os.getpid():
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix='llm-hedge')
+                self._hedge_pid = os.getpid()
+            return self._hedge_executor
+
+    def hedged_chat_content(self, models: List[str], messages: List[Dict[str, str]],
+                            hedge_delay: Optional[float], validate: Optional[Callable[[str], Any]] = None,
+                            **kwargs: Any) -> Tuple[str, str]:
+        """
+        Race a list of models and return ``(model, content)`` from the first
+        one whose answer passes ``validate``.
+
+        The first model starts immediately. The next one starts when the
+        current attempts have run for ``hedge_delay`` seconds without an
+        answer, or as soon as an attempt fails. ``hedge_delay=None`` gives
+        plain sequential fallback. Losing requests that are still in flight
+        cannot be interrupted; their answers are discarded.
+        """
+        executor = self._get_hedge_executor()
+        remaining = list(models)
+        pending = {}
+        last_error = None
+
+        def launch():
+            model = remaining.pop(0)
+            logger.info(f"Starting LLM request on {model}")
+            # Copy the context so the call keeps the caller's rate-limit priority
+            context = contextvars.copy_context()
+            pending[executor.submit(context.run, self.chat_content, model, messages, **kwargs)] = model
+
+        launch()
+        while pending:
+            done, _ = wait(list(pending), timeout=hedge_delay if remaining else None, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info(f"No answer within {hedge_delay}s, hedging with the next model")
+                launch()
+                continue
+
+            for future in done:
+                model = pending.pop(future)
+                try:
+                    content = future.result()
+                    if validate:
+                        validate(content)
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"Model {model} failed: {e}")
+                    if remaining:
+                        launch()
+                    continue
+
+                for other in pending:
+                    other.cancel()
+                return model, content
+
+        if isinstance(last_error, LLMError):
+            raise last_error
+        raise LLMError(f"All models failed. Last error: {last_error}")
+
+
+llm_client = GroqClient(
+    api_key=os.getenv("GROQ_API_KEY"),
+    base_url=os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1"),
+    pool_connections=int(os.getenv("GROQ_POOL_CONNECTIONS", "4")),
+    pool_maxsize=int(os.getenv("GROQ_POOL_MAXSIZE", "20")),
+    connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "60")),
+    hedge_workers=int(os.getenv("GROQ_HEDGE_WORKERS", "16"))
+)
+register_metrics('llm_singleflight', llm_client.singleflight.stats)
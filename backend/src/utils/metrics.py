@@ -0,0 +1,76 @@
+"""
+Lightweight in-process metrics
+Rolling latency statistics and a registry of named metric sources
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Thread-safe rolling window of latency samples in milliseconds"""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        with self._lock:
+            self._samples.append(duration_ms)
+            self.count += 1
+            self.total_ms += duration_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals since start plus percentiles over the recent window"""
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total_ms, max_ms = self.count, self.total_ms, self.max_ms
+
+        return {
+            'count': count,
+            'avg_ms': round(total_ms / count, 2) if count else 0.0,
+            'p50_ms': _percentile(samples, 50),
+            'p95_ms': _percentile(samples, 95),
+            'p99_ms': _percentile(samples, 99),
+            'max_ms': round(max_ms, 2)
+        }
+
+
+def _percentile(sorted_samples, pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100.0 * (len(sorted_samples) - 1))))
+    return round(sorted_samples[index], 2)
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def register_metrics(name: str, source: Callable[[], Dict[str, Any]]) -> None:
+    """Register a callable returning a JSON-serialisable metrics dict"""
+    with _sources_lock:
+        _sources[name] = source
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """Snapshot every registered metrics source"""
+    with _sources_lock:
+        sources = dict(_sources)
+
+    metrics = {}
+    for name, source in sorted(sources.items()):
+        try:
+            metrics[name] = source()
+        except Exception as e:
+            logger.error(f"Error collecting metrics for {name}: {e}")
+            metrics[name] = {'error': str(e)}
+    return metrics
@@ -0,0 +1,177 @@
+"""
+Per-model circuit breakers for LLM calls
+Tracks outcomes and latency per model and stops sending traffic to models that keep failing
+"""
+
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Dict, List
+
+from utils.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ModelBreaker:
+    """
+    Circuit breaker for a single model.
+
+    ``failure_threshold`` consecutive failures open the circuit for
+    ``cooldown`` seconds. A model the API reports as missing or
+    decommissioned opens for ``not_found_cooldown`` instead. Once the
+    cooldown passes, one probe request is let through (half-open); its
+    outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, model: str, failure_threshold: int, cooldown: float, not_found_cooldown: float,
+                 window: int):
+        self.model = model
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.not_found_cooldown = not_found_cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probe_started = None
+        self.outcomes = deque(maxlen=window)
+        self.latency = LatencyStats()
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.not_found = 0
+        self.skipped = 0
+        self.last_error = None
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+            self.probe_started = None
+        if self.state == HALF_OPEN:
+            # A probe that never reported back (e.g. its caller died) must not block the model forever
+            if self.probe_started is None or now - self.probe_started > self.cooldown:
+                self.probe_started = now
+                return True
+        self.skipped += 1
+        return False
+
+    def on_success(self, latency_ms: float) -> None:
+        if self.state != CLOSED:
+            logger.info(f"Circuit for model {self.model} closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.probe_started = None
+        self.successes += 1
+        self.outcomes.append(True)
+        self.latency.observe(latency_ms)
+
+    def on_inconclusive(self) -> None:
+        # Free the half-open probe slot so the next request can probe instead
+        self.probe_started = None
+
+    def on_failure(self, now: float, error: str, kind: str) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.outcomes.append(False)
+        self.last_error = error
+        if kind == 'timeout':
+            self.timeouts += 1
+
+        if kind == 'not_found':
+            self.not_found += 1
+            self._open(now, self.not_found_cooldown)
+        elif self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open(now, self.cooldown)
+
+    def _open(self, now: float, cooldown: float) -> None:
+        if self.state != OPEN:
+            logger.warning(f"Circuit for model {self.model} opened for {cooldown}s: {self.last_error}")
+        self.state = OPEN
+        self.open_until = now + cooldown
+        self.probe_started = None
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        recent = len(self.outcomes)
+        return {
+            'state': self.state,
+            'open_for_s': round(max(0.0, self.open_until - now), 1) if self.state == OPEN else 0.0,
+            'consecutive_failures': self.consecutive_failures,
+            'recent_error_rate': round(self.outcomes.count(False) / recent, 4) if recent else 0.0,
+            'successes': self.successes,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'not_found': self.not_found,
+            'skipped': self.skipped,
+            'last_error': self.last_error,
+            'latency': self.latency.snapshot()
+        }
+
+
+class ModelHealth:
+    """Registry of breakers, one per model name, shared by every LLM caller"""
+
+    def __init__(self, failure_threshold: int, cooldown: float, not_found_cooldown: float, window: int):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.not_found_cooldown = not_found_cooldown
+        self.window = window
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, model: str) -> ModelBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = ModelBreaker(model, self.failure_threshold, self.cooldown, self.not_found_cooldown, self.window)
+            self._breakers[model] = breaker
+        return breaker
+
+    def allow(self, model: str) -> bool:
+        """True if a request to ``model`` may be sent now (reserves the probe when half-open)"""
+        with self._lock:
+            return self._breaker(model).allow(time.monotonic())
+
+    def record_success(self, model: str, latency_ms: float) -> None:
+        with self._lock:
+            self._breaker(model).on_success(latency_ms)
+
+    def record_inconclusive(self, model: str) -> None:
+        """Record a call whose outcome says nothing about the model (e.g. a rejected API key)"""
+        with self._lock:
+            self._breaker(model).on_inconclusive()
+
+    def record_failure(self, model: str, error: str, kind: str = 'error') -> None:
+        """Record a failed call; ``kind`` is 'error', 'timeout' or 'not_found'"""
+        with self._lock:
+            self._breaker(model).on_failure(time.monotonic(), error, kind)
+
+    def available_models(self, models: List[str]) -> List[str]:
+        """Models from ``models`` whose circuit is not open, without reserving probes"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                model for model in models
+                if model not in self._breakers
+                or self._breakers[model].state == CLOSED
+                or self._breakers[model].open_until <= now
+            ]
+
+    def scoreboard(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {model: breaker.snapshot(now) for model, breaker in sorted(self._breakers.items())}
+
+
+model_health = ModelHealth(
+    failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '3')),
+    cooldown=float(os.getenv('LLM_BREAKER_COOLDOWN', '30')),
+    not_found_cooldown=float(os.getenv('LLM_BREAKER_NOT_FOUND_COOLDOWN', '3600')),
+    window=int(os.getenv('LLM_BREAKER_WINDOW', '50'))
+)
@@ -0,0 +1,111 @@
+"""
+Password hashing off the request thread
+Runs bcrypt on a bounded worker pool and sheds load once the queue is full
+"""
+
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+from utils.cooperative import native_thread_pool
+from utils.metrics import LatencyStats, register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusyError(Exception):
+    """Raised when too many hashing jobs are already waiting"""
+
+
+class PasswordHasher:
+    """
+    bcrypt on a dedicated thread pool sized to the CPU count.
+
+    bcrypt releases the GIL, so the pool runs hashes in parallel while
+    request threads only wait on a future. At most ``max_queue`` jobs may
+    wait beyond the ones running; further calls fail fast with
+    HasherBusyError so the caller can answer 429.
+    """
+
+    def __init__(self, workers: int, max_queue: int, rounds: int, timeout: float):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self.queue_wait = LatencyStats()
+        self.hash_time = LatencyStats()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so forked server workers each get their own threads
+        if self._executor is None or self._pid != os.getpid():
+            # Real OS threads even in gevent workers, where bcrypt would otherwise block the event loop
+            self._executor = native_thread_pool(self.workers, 'bcrypt')
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherBusyError("Password hashing queue is full")
+            self._pending += 1
+            executor = self._get_executor()
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            self.queue_wait.observe((started - submitted) * 1000)
+            try:
+                return fn(*args)
+            finally:
+                self.hash_time.observe((time.perf_counter() - started) * 1000)
+
+        def done(_):
+            with self._lock:
+                self._pending -= 1
+
+        future = executor.submit(job)
+        future.add_done_callback(done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HasherBusyError(f"Password hashing took longer than {self.timeout}s")
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost factor"""
+        hashed = self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)))
+        return hashed.decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against a stored bcrypt hash"""
+        return self._run(lambda: bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8')))
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'rounds': self.rounds,
+            'pending': self._pending,
+            'rejected': self.rejected,
+            'queue_wait': self.queue_wait.snapshot(),
+            'hash_time': self.hash_time.snapshot()
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv('BCRYPT_WORKERS', str(os.cpu_count() or 1))),
+    max_queue=int(os.getenv('BCRYPT_MAX_QUEUE', '32')),
+    rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+    timeout=float(os.getenv('BCRYPT_TIMEOUT', '10'))
+)
+register_metrics('password_hasher', password_hasher.stats)
@@ -1,20 +1,225 @@
+"""
+PDF text extraction
+Extracts page text on a process pool for larger documents, within configurable size and page limits
+"""
+
 import PyPDF2
+import hashlib
 import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Iterator, List, Tuple
+
+from utils.cooperative import is_cooperative, run_blocking
+from utils.metrics import LatencyStats, register_metrics
 
 logger = logging.getLogger(__name__)
 
+PDF_MAX_BYTES = int(os.getenv('PDF_MAX_BYTES', str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '50'))
+# Below this many pages the pickling round-trip costs more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '8'))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Uploads larger than this are spooled to a temporary file instead of memory
+PDF_SPOOL_BYTES = int(os.getenv('PDF_SPOOL_BYTES', str(1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Pool processes must not be forked from a threaded server worker, where another
+# thread may hold a lock (database pool, caches, logging) at fork time
+PDF_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+PDF_MAGIC = b'%PDF-'
+
+
+class PDFLimitError(Exception):
+    """Raised when a PDF exceeds the configured byte or page limit"""
+
+
+class InvalidPDFError(Exception):
+    """Raised when an upload does not start with the PDF magic bytes"""
+
+
+def _extract_range(file_content: bytes, start: int, stop: int) -> List[str]:
+    """Extract pages ``start``..``stop - 1``; runs inside a pool process"""
+    reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+class PDFExtractor:
+    """
+    Page-level text extraction.
+
+    Text extraction is pure-Python and holds the GIL, so documents with at
+    least ``parallel_min_pages`` pages are split into contiguous page ranges
+    and extracted on a process pool; smaller ones stay on the calling thread.
+    """
+
+    def __init__(self, max_bytes: int, max_pages: int, parallel_min_pages: int, workers: int):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.parallel_min_pages = max(2, parallel_min_pages)
+        self.workers = max(1, workers)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.pages = 0
+        self.parallel = 0
+        self.rejected = 0
+        self.extract_time = LatencyStats()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so forked server workers each get their own processes
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(PDF_START_METHOD)
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            self._executor = None
+
+    def open(self, file_content: bytes) -> PyPDF2.PdfReader:
+        """Open a PDF after checking it against the byte and page limits"""
+        if len(file_content) > self.max_bytes:
+            self.rejected += 1
+            raise PDFLimitError(f"PDF is larger than {self.max_bytes // (1024 * 1024)} MB")
+        reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        if len(reader.pages) > self.max_pages:
+            self.rejected += 1
+            raise PDFLimitError(f"PDF has more than {self.max_pages} pages")
+        return reader
+
+    def spool_upload(self, stream: BinaryIO) -> Tuple[BinaryIO, str]:
+        """
+        Copy an upload stream into a bounded temporary buffer in chunks,
+        rejecting content that doesn't start with the PDF magic bytes or
+        exceeds ``max_bytes``. Werkzeug has already parsed the multipart body
+        into its own spooled file by the time this runs, so MAX_CONTENT_LENGTH
+        is what bounds the bytes read off the socket; this bounds the copy.
+        Returns the rewound buffer and the SHA-256 of its content.
+        """
+        spooled = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_BYTES)
+        digest = hashlib.sha256()
+        header = b''
+        size = 0
+        try:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                # Reads may return fewer bytes than asked, so collect the
+                # whole magic before checking it
+                if len(header) < len(PDF_MAGIC):
+                    header += chunk[:len(PDF_MAGIC) - len(header)]
+                    if not PDF_MAGIC.startswith(header):
+                        raise InvalidPDFError("Uploaded file is not a PDF")
+                size += len(chunk)
+                if size > self.max_bytes:
+                    self.rejected += 1
+                    raise PDFLimitError(f"PDF is larger than {self.max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                spooled.write(chunk)
+
+            if header != PDF_MAGIC:
+                raise InvalidPDFError("Uploaded file is not a PDF")
+        except Exception:
+            spooled.close()
+            raise
+
+        spooled.seek(0)
+        return spooled, digest.hexdigest()
+
+    def iter_pages(self, file_content: bytes) -> Iterator[str]:
+        """Yield the text of each page in order as soon as it is extracted"""
+        started = time.perf_counter()
+        reader = self.open(file_content)
+        page_count = len(reader.pages)
+
+        if is_cooperative():
+            # multiprocessing does not mix with gevent's patched threads, so
+            # gevent workers extract on a native thread off the event loop
+            pages = run_blocking(_extract_range, file_content, 0, page_count)
+        elif page_count >= self.parallel_min_pages and self.workers > 1:
+            pages = self._iter_parallel(file_content, page_count)
+            self.parallel += 1
+        else:
+            pages = (page.extract_text() or "" for page in reader.pages)
+
+        for text in pages:
+            yield text
+
+        self.documents += 1
+        self.pages += page_count
+        self.extract_time.observe((time.perf_counter() - started) * 1000)
+
+    def _iter_parallel(self, file_content: bytes, page_count: int) -> Iterator[str]:
+        chunk = -(-page_count // self.workers)
+        ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+        try:
+            futures = [self._get_executor().submit(_extract_range, file_content, start, stop)
+                       for start, stop in ranges]
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+
+        try:
+            # Results are consumed in page order; later ranges keep running meanwhile
+            for future in futures:
+                yield from future.result()
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stats(self):
+        return {
+            'max_bytes': self.max_bytes,
+            'max_pages': self.max_pages,
+            'workers': self.workers,
+            'documents': self.documents,
+            'pages': self.pages,
+            'parallel': self.parallel,
+            'rejected': self.rejected,
+            'extract_time': self.extract_time.snapshot()
+        }
+
+
+pdf_extractor = PDFExtractor(
+    max_bytes=PDF_MAX_BYTES,
+    max_pages=PDF_MAX_PAGES,
+    parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+    workers=PDF_WORKERS
+)
+register_metrics('pdf_extractor', pdf_extractor.stats)
+
+
+def spool_pdf_upload(stream):
+    """Spool an upload within PDF_MAX_BYTES; returns (file, sha256 hex digest)"""
+    return pdf_extractor.spool_upload(stream)
+
+
+def iter_pdf_pages(file_content):
+    """Yield page text as it is extracted; raises PDFLimitError over the limits"""
+    return pdf_extractor.iter_pages(file_content)
+
+
 def extract_text_from_pdf(file_content):
     """Extract text from PDF file content"""
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        
-        return text.strip()
+        return "\n".join(iter_pdf_pages(file_content)).strip()
+    except PDFLimitError:
+        raise
     except Exception as e:
         logger.error(f"PDF extraction error: {e}")
         return None
-
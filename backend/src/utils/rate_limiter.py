@@ -0,0 +1,275 @@
+"""
+Client-side rate limiting for Groq
+Per-model request and token budgets that queue calls by priority and tune themselves from response headers
+"""
+
+import os
+import re
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+from utils.metrics import LatencyStats, register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority = ContextVar('llm_priority', default=INTERACTIVE)
+
+# Rough size of a token for Llama tokenizers on English text
+CHARS_PER_TOKEN = 4
+# Share of max_tokens reserved for the completion up front; answers rarely
+# use the whole budget and the reservation is corrected from reported usage
+OUTPUT_RESERVE_RATIO = float(os.getenv('GROQ_OUTPUT_RESERVE_RATIO', '0.5'))
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+class RateLimitExceededError(Exception):
+    """Raised when a call could not get budget within the scheduler's max wait"""
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Run LLM calls made inside the block (on this thread or context) at ``priority``"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Prompt tokens estimated from characters, plus the expected share of the completion budget"""
+    chars = sum(len(message.get('content') or '') for message in messages)
+    return chars // CHARS_PER_TOKEN + int(max_tokens * OUTPUT_RESERVE_RATIO)
+
+
+def key_id(api_key: Optional[str]) -> str:
+    """Short, non-reversible identity of an API key; each Groq key has its own quota"""
+    return hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:8]
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Groq reset values such as '7.66s', '2m59.56s' or '120ms' into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(float(headers[name]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ModelBudget:
+    """
+    Token buckets for one model under one API key: requests per minute and
+    tokens per minute.
+
+    Both refill continuously at limit / 60 per second up to the limit.
+    ``blocked_until`` holds back every call after the server reports an
+    exhausted quota or answers 429 with Retry-After.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = max(1, rpm)
+        self.tpm = max(1, tpm)
+        self.requests = float(self.rpm)
+        self.tokens = float(self.tpm)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiters = []
+        self.granted = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.wait_time = LatencyStats()
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60.0)
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60.0)
+            self.updated = now
+
+    def wait_for(self, tokens: int, now: float) -> float:
+        """Seconds until one request of ``tokens`` fits in both buckets"""
+        waits = [self.blocked_until - now]
+        if self.requests < 1:
+            waits.append((1 - self.requests) * 60.0 / self.rpm)
+        if self.tokens < tokens:
+            waits.append((tokens - self.tokens) * 60.0 / self.tpm)
+        return max(0.0, *waits)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self.refill(now)
+        return {
+            'rpm_limit': self.rpm,
+            'tpm_limit': self.tpm,
+            'requests_available': round(self.requests, 2),
+            'tokens_available': int(self.tokens),
+            'blocked_for_s': round(max(0.0, self.blocked_until - now), 2),
+            'waiting': len(self.waiters),
+            'granted': self.granted,
+            'waited': self.waited,
+            'timeouts': self.timeouts,
+            'throttled': self.throttled,
+            'wait_time': self.wait_time.snapshot()
+        }
+
+
+class RateLimitScheduler:
+    """
+    Process-wide admission control for LLM calls.
+
+    Budgets are kept per (API key, model), since Groq enforces its limits per
+    key; ``account`` is the key's ``key_id``. ``acquire`` blocks until the
+    budget covers the call. Waiters for a budget are served strictly by
+    (priority, arrival), so an interactive
+    request never queues behind background jobs. Calls that would wait
+    longer than ``max_wait`` fail with RateLimitExceededError, leaving the
+    caller free to fall back to another model.
+    """
+
+    def __init__(self, default_rpm: int, default_tpm: int, max_wait: float):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.max_wait = max_wait
+        self._budgets = {}
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+
+    def _budget(self, account: str, model: str) -> ModelBudget:
+        budget = self._budgets.get((account, model))
+        if budget is None:
+            budget = ModelBudget(self.default_rpm, self.default_tpm)
+            self._budgets[(account, model)] = budget
+        return budget
+
+    def acquire(self, account: str, model: str, tokens: int, priority: Optional[int] = None) -> int:
+        """Reserve one request and ``tokens`` tokens; returns the tokens actually reserved"""
+        priority = _priority.get() if priority is None else priority
+        started = time.monotonic()
+        deadline = started + self.max_wait
+
+        with self._cond:
+            budget = self._budget(account, model)
+            # A single call larger than the whole bucket would otherwise never fit
+            tokens = min(tokens, budget.tpm)
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(budget.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    budget.refill(now)
+                    # Only the head of the queue knows how long it needs; the
+                    # others sleep until woken by a change to the queue
+                    delay = budget.wait_for(tokens, now) if budget.waiters[0] == ticket else None
+                    if delay is not None and delay <= 0:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0 or (delay is not None and delay > remaining):
+                        budget.timeouts += 1
+                        raise RateLimitExceededError(
+                            f"No rate-limit budget for {model} (key {account}) within {self.max_wait}s"
+                        )
+                    self._cond.wait(remaining if delay is None else delay)
+
+                budget.requests -= 1
+                budget.tokens -= tokens
+                budget.granted += 1
+            finally:
+                budget.waiters.remove(ticket)
+                heapq.heapify(budget.waiters)
+                self._cond.notify_all()
+
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            budget.waited += 1
+        budget.wait_time.observe(waited * 1000)
+        return tokens
+
+    def settle(self, account: str, model: str, reserved_tokens: int, used_tokens: Optional[int] = None,
+               sent: bool = True) -> None:
+        """Correct a reservation once the real usage is known, or refund it if nothing was sent"""
+        with self._cond:
+            budget = self._budget(account, model)
+            if not sent:
+                budget.requests = min(budget.rpm, budget.requests + 1)
+                budget.tokens = min(budget.tpm, budget.tokens + reserved_tokens)
+            elif used_tokens is not None:
+                budget.tokens = min(budget.tpm, budget.tokens + reserved_tokens - used_tokens)
+            self._cond.notify_all()
+
+    def observe_headers(self, account: str, model: str, headers: Mapping[str, str], status_code: int) -> None:
+        """
+        Tune the key's budget for the model from Groq's x-ratelimit-* headers: the token
+        limit replaces the configured TPM, remaining counts cap the buckets
+        and an exhausted quota or a 429 blocks the model until it resets.
+        """
+        now = time.monotonic()
+        limit_tokens = _header_int(headers, 'x-ratelimit-limit-tokens')
+        remaining_tokens = _header_int(headers, 'x-ratelimit-remaining-tokens')
+        remaining_requests = _header_int(headers, 'x-ratelimit-remaining-requests')
+
+        block_for = None
+        if status_code == 429:
+            block_for = parse_duration(headers.get('retry-after')) or parse_duration(
+                headers.get('x-ratelimit-reset-tokens')) or 1.0
+        elif remaining_requests == 0:
+            block_for = parse_duration(headers.get('x-ratelimit-reset-requests'))
+
+        with self._cond:
+            budget = self._budget(account, model)
+            budget.refill(now)
+            if limit_tokens and limit_tokens != budget.tpm:
+                logger.info(f"Token limit for {model} (key {account}) is {limit_tokens}/min (was {budget.tpm})")
+                budget.tpm = limit_tokens
+            if remaining_tokens is not None:
+                budget.tokens = min(budget.tokens, remaining_tokens)
+            if status_code == 429:
+                budget.throttled += 1
+            if block_for:
+                budget.blocked_until = max(budget.blocked_until, now + block_for)
+                logger.warning(f"Rate limited on {model} (key {account}); holding calls for {block_for:.1f}s")
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            keys = {}
+            for (account, model), budget in sorted(self._budgets.items()):
+                keys.setdefault(account, {})[model] = budget.snapshot(now)
+            return {
+                'max_wait_s': self.max_wait,
+                'keys': keys
+            }
+
+
+rate_limiter = RateLimitScheduler(
+    default_rpm=int(os.getenv('GROQ_RPM_LIMIT', '30')),
+    default_tpm=int(os.getenv('GROQ_TPM_LIMIT', '6000')),
+    max_wait=float(os.getenv('GROQ_RATE_LIMIT_MAX_WAIT', '20'))
+)
+register_metrics('llm_rate_limiter', rate_limiter.stats)
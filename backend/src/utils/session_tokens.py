@@ -0,0 +1,145 @@
+"""
+Stateless session tokens
+HMAC-signed, expiring tokens that carry the user and session id, plus an
+in-memory revocation list so logout still works without a database lookup
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 'v1'
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class SessionTokenSigner:
+    """Issues and verifies ``v1.<payload>.<signature>`` session tokens"""
+
+    def __init__(self, secret: str):
+        self._key = secret.encode('utf-8')
+
+    @staticmethod
+    def is_signed_token(token: str) -> bool:
+        return token.startswith(TOKEN_VERSION + '.')
+
+    def _sign(self, message: bytes) -> str:
+        return _b64encode(hmac.new(self._key, message, hashlib.sha256).digest())
+
+    def issue(self, user: Dict[str, Any], session_id: str, expires_at: datetime) -> str:
+        """Create a signed token for a user and session"""
+        created_at = user.get('created_at')
+        payload = {
+            'uid': user['id'],
+            'sid': session_id,
+            'exp': int(expires_at.timestamp()),
+            'em': user['email'],
+            'fn': user['first_name'],
+            'ln': user['last_name'],
+            'ca': created_at.isoformat() if isinstance(created_at, datetime) else created_at
+        }
+        body = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        message = f"{TOKEN_VERSION}.{body}".encode('ascii')
+        return f"{TOKEN_VERSION}.{body}.{self._sign(message)}"
+
+    def decode(self, token: str, verify_expiry: bool = True) -> Optional[Dict[str, Any]]:
+        """Return the token payload if the signature (and expiry) check out"""
+        try:
+            version, body, signature = token.split('.')
+        except ValueError:
+            return None
+        if version != TOKEN_VERSION:
+            return None
+
+        expected = self._sign(f"{version}.{body}".encode('ascii'))
+        if not hmac.compare_digest(expected, signature):
+            return None
+
+        try:
+            payload = json.loads(_b64decode(body))
+        except (ValueError, TypeError):
+            return None
+
+        if verify_expiry and payload.get('exp', 0) <= time.time():
+            return None
+        return payload
+
+    @staticmethod
+    def user_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild the user dict validate_session returns"""
+        created_at = payload.get('ca')
+        try:
+            created_at = datetime.fromisoformat(created_at) if created_at else None
+        except ValueError:
+            pass
+        return {
+            'id': payload['uid'],
+            'email': payload['em'],
+            'first_name': payload['fn'],
+            'last_name': payload['ln'],
+            'created_at': created_at
+        }
+
+
+class RevocationList:
+    """
+    Set of revoked session ids kept in memory.
+
+    The set is reloaded from the database at most every ``refresh_interval``
+    seconds so logouts on other replicas are picked up; local logouts are
+    added immediately.
+    """
+
+    def __init__(self, loader: Callable[[], Optional[Iterable[str]]], refresh_interval: float = 30.0):
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self._revoked = frozenset()
+        self._recent = {}  # locally revoked id -> time, kept until a reload has surely seen it
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_interval:
+            return
+        # Only one thread reloads; others keep using the current set
+        if not self._lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+            revoked = self._loader()
+            if revoked is not None:
+                self._revoked = frozenset(revoked)
+            self._loaded_at = time.monotonic()
+            cutoff = self._loaded_at - 2 * self.refresh_interval
+            self._recent = {sid: at for sid, at in list(self._recent.items()) if at > cutoff}
+        except Exception as e:
+            logger.error(f"Error refreshing session revocation list: {e}")
+            self._loaded_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def is_revoked(self, session_id: str) -> bool:
+        self._refresh_if_stale()
+        return session_id in self._revoked or session_id in self._recent
+
+    def add(self, session_id: str) -> None:
+        self._recent[session_id] = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._revoked | set(self._recent))
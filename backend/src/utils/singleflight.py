@@ -0,0 +1,82 @@
+"""
+Singleflight call deduplication
+Concurrent calls with the same key share one execution and its result
+"""
+
+import copy
+import threading
+import logging
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is in flight wait for it and get a
+    deep copy of its result, or the same exception. Nothing is cached:
+    once the call finishes, the next caller starts a new one.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``fn`` unless a call for ``key`` is in flight; returns (result, shared)"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            result = fn()
+            call.result = result
+            return result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.followers:
+                # Snapshot before the leader's caller can modify its copy
+                call.result = copy.deepcopy(call.result)
+                logger.info(f"Shared one upstream call with {call.followers} identical concurrent caller(s)")
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            'calls': self.calls,
+            'collapsed': self.collapsed,
+            'in_flight': in_flight,
+            'collapse_rate': round(self.collapsed / self.calls, 4) if self.calls else 0.0
+        }
@@ -0,0 +1,27 @@
+"""
+Server-Sent Events helpers
+Formats events and wraps generators in a streaming Flask response
+"""
+
+import json
+from typing import Any, Iterable
+
+from flask import Response, stream_with_context
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one event; ``data`` is sent as a single JSON line"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: Iterable[str]) -> Response:
+    """Stream pre-formatted events, keeping the request context alive while they are produced"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -5,6 +5,7 @@ interface Workspace {
   name: string;
   description?: string;
   analysis_data?: any;
+  has_analysis?: boolean;
   resume_filename?: string;
   job_title?: string;
   job_company?: string;
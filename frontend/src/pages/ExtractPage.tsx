@@ -137,7 +137,7 @@ const ExtractPage = () => {
                 name: workspace.name,
                 description: workspace.description,
                 workplace_id: workspace.id
-            });
+            }, (stage, progress) => setAnalysisStatus(`${stage}... (${progress}%)`));
             
             setAnalysisStatus('Analysis generated successfully!');
             
@@ -44,6 +44,7 @@ interface Workspace {
   job_title?: string;
   job_company?: string;
   analysis_data?: any;
+  has_analysis?: boolean;
 }
 
 const HomePage: React.FC = () => {
@@ -168,7 +169,17 @@ const HomePage: React.FC = () => {
     }
   };
 
-  const handleWorkspaceClick = (workspace: Workspace) => {
+  const handleWorkspaceClick = async (workspace: Workspace) => {
+    // The listing only carries a has_analysis flag; fetch the analysis itself on open
+    if (workspace.has_analysis && !workspace.analysis_data) {
+      try {
+        const response = await apiService.getWorkplace(workspace.id);
+        workspace = { ...workspace, analysis_data: response.workplace?.analysis_data };
+      } catch (error: any) {
+        console.error('Error loading workspace analysis:', error);
+      }
+    }
+
     // Set the workspace in context for global access
     setCurrentWorkspace(workspace);
     
@@ -279,7 +290,7 @@ const HomePage: React.FC = () => {
 
   const getWorkspaceTimestamp = (workspace: Workspace) => {
     // If workspace has analysis data, it has been updated - show updated time
-    if (workspace.analysis_data) {
+    if (workspace.has_analysis || workspace.analysis_data) {
       return {
         label: "Updated",
         time: workspace.updated_at,
@@ -427,7 +438,7 @@ const HomePage: React.FC = () => {
                       </Typography>
                       
                       {/* Analysis Status Indicator */}
-                      {workspace.analysis_data ? (
+                      {workspace.has_analysis || workspace.analysis_data ? (
                         <Box
                           sx={{
                             display: 'inline-flex',
@@ -110,11 +110,22 @@ class ApiService {
   }
 
   // AI suggestions endpoints
-  async getAISuggestions(filters?: { type?: string; isRead?: boolean }) {
+  // Paged: pass the previous response's next_cursor to fetch the following page
+  async getAISuggestions(filters?: {
+    type?: string;
+    isRead?: boolean;
+    limit?: number;
+    cursor?: string;
+    includeContent?: boolean;
+  }) {
     const params = new URLSearchParams();
     if (filters?.type) params.append("type", filters.type);
     if (filters?.isRead !== undefined)
       params.append("isRead", filters.isRead.toString());
+    if (filters?.limit) params.append("limit", filters.limit.toString());
+    if (filters?.cursor) params.append("cursor", filters.cursor);
+    if (filters?.includeContent !== undefined)
+      params.append("includeContent", filters.includeContent.toString());
 
     const response = await fetch(`${API_BASE_URL}/ai-suggestions?${params}`, {
       headers: this.getAuthHeaders(),
@@ -150,19 +161,56 @@ class ApiService {
   }
 
   // Analysis endpoints
-  async generateAnalysis(data?: {
-    name?: string;
-    description?: string;
-    workplace_id?: number;
-  }) {
+  // Queues the analysis, then polls the background job until it finishes
+  async generateAnalysis(
+    data?: {
+      name?: string;
+      description?: string;
+      workplace_id?: number;
+    },
+    onProgress?: (stage: string, progress: number) => void
+  ) {
     const response = await fetch(`${API_BASE_URL}/analysis/generate`, {
       method: "POST",
       headers: this.getAuthHeaders(),
       body: JSON.stringify(data || {}),
     });
+    const queued = await this.handleResponse(response);
+
+    const job = await this.waitForJob(queued.job_id, onProgress);
+    if (job.status === "failed") {
+      throw new Error(job.error || "Analysis failed");
+    }
+    return { ...queued, gap_analysis: job.result?.gap_analysis ?? null };
+  }
+
+  // Background job endpoints
+  async getJob(jobId: string) {
+    const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, {
+      headers: this.getAuthHeaders(),
+    });
     return this.handleResponse(response);
   }
 
+  // Gives up after timeoutMs; the server reports lost jobs as failed well before that
+  async waitForJob(
+    jobId: string,
+    onProgress?: (stage: string, progress: number) => void,
+    intervalMs: number = 2000,
+    timeoutMs: number = 16 * 60 * 1000
+  ) {
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+      const { job } = await this.getJob(jobId);
+      onProgress?.(job.stage, job.progress);
+      if (job.status === "succeeded" || job.status === "failed") {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+    throw new Error("Timed out waiting for the job to finish");
+  }
+
   // Goals endpoints
   async createGoal(data: {
     workplace_id: number;
@@ -245,8 +293,10 @@ class ApiService {
     return this.handleResponse(response);
   }
 
-  async getWorkplaces() {
-    const response = await fetch(`${API_BASE_URL}/workplaces`, {
+  // Summaries only (has_analysis flag); pass includeAnalysis for the full analysis_data
+  async getWorkplaces(includeAnalysis: boolean = false) {
+    const query = includeAnalysis ? "?include=analysis" : "";
+    const response = await fetch(`${API_BASE_URL}/workplaces${query}`, {
       method: "GET",
       headers: this.getAuthHeaders(),
     });